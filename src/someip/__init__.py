@@ -1,7 +1,14 @@
-from importlib.metadata import version, PackageNotFoundError
+def __getattr__(name: str) -> str:
+    # importing importlib.metadata and looking up the distribution is expensive, so
+    # only do it when __version__ is actually requested (PEP 562)
+    if name == "__version__":
+        from importlib.metadata import version, PackageNotFoundError
 
-try:
-    __version__ = version(__name__)
-except PackageNotFoundError:  # pragma: nocover
-    # package is not installed
-    pass
+        try:
+            __version__ = version(__name__)
+        except PackageNotFoundError:  # pragma: nocover
+            # package is not installed
+            raise AttributeError(name) from None
+        globals()["__version__"] = __version__
+        return __version__
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -7,18 +7,51 @@ from __future__ import annotations
 
 import dataclasses
 import ipaddress
-import socket
 import typing
 
 import someip.header
+from someip.header import _DATACLASS_SLOTS
 
 
 _T_ADDR = typing.Tuple[typing.Union[ipaddress.IPv4Address, ipaddress.IPv6Address], int]
 _T_SOCKNAME = typing.Union[typing.Tuple[str, int], typing.Tuple[str, int, int, int]]
 
+# enum member lookups on the class are comparatively slow, bind them once for the
+# matches_* methods that run for every received SD entry
+_FIND_SERVICE = someip.header.SOMEIPSDEntryType.FindService
+_OFFER_SERVICE = someip.header.SOMEIPSDEntryType.OfferService
+_SUBSCRIBE = someip.header.SOMEIPSDEntryType.Subscribe
 
-@dataclasses.dataclass(frozen=True)
-class Eventgroup:
+# upper bound of cached Eventgroup.for_service results per eventgroup
+_FOR_SERVICE_CACHE_SIZE = 64
+
+
+class _Cached:
+    # base for the frozen config dataclasses below. subclasses keep caches of derived
+    # values in their own __slots__, outside of the dataclass fields, so they don't
+    # show up in dataclasses.fields(), asdict() or astuple()
+    __slots__ = ()
+
+    def __reduce__(self) -> typing.Tuple[typing.Any, ...]:
+        # the default pickle state of slotted dataclasses only holds the fields. go
+        # through __init__ so that the caches are set up again
+        fields = dataclasses.fields(typing.cast(typing.Any, self))
+        return (self.__class__, tuple(getattr(self, f.name) for f in fields if f.init))
+
+
+class _EventgroupCache(_Cached):
+    __slots__ = ("_entries", "_for_service")
+
+    # entries are immutable, so created entries are cached per (ttl, counter)
+    _entries: typing.Dict[typing.Tuple[int, int], someip.header.SOMEIPSDEntry]
+    # results of for_service, keyed by the service fields it depends on
+    _for_service: typing.Dict[
+        typing.Tuple[int, int, int, int], typing.Optional[Eventgroup]
+    ]
+
+
+@dataclasses.dataclass(frozen=True, **_DATACLASS_SLOTS)
+class Eventgroup(_EventgroupCache):
     """
     Defines an Eventgroup that can be subscribed to.
 
@@ -40,6 +73,10 @@ class Eventgroup:
 
     protocol: someip.header.L4Protocols
 
+    def __post_init__(self) -> None:
+        object.__setattr__(self, "_entries", {})
+        object.__setattr__(self, "_for_service", {})
+
     def create_subscribe_entry(
         self, ttl: int = 3, counter: int = 0
     ) -> someip.header.SOMEIPSDEntry:
@@ -51,16 +88,20 @@ class Eventgroup:
           identical subscriptions
         :return: the Subscribe SD entry for this eventgroup
         """
-        endpoint_option = self._sockaddr_to_endpoint(self.sockname, self.protocol)
-        return someip.header.SOMEIPSDEntry(
-            sd_type=someip.header.SOMEIPSDEntryType.Subscribe,
-            service_id=self.service_id,
-            instance_id=self.instance_id,
-            major_version=self.major_version,
-            ttl=ttl,
-            minver_or_counter=(counter << 16) | self.eventgroup_id,
-            options_1=(endpoint_option,),
-        )
+        entry = self._entries.get((ttl, counter))
+        if entry is None:
+            endpoint_option = self._sockaddr_to_endpoint(self.sockname, self.protocol)
+            entry = someip.header.SOMEIPSDEntry(
+                sd_type=_SUBSCRIBE,
+                service_id=self.service_id,
+                instance_id=self.instance_id,
+                major_version=self.major_version,
+                ttl=ttl,
+                minver_or_counter=(counter << 16) | self.eventgroup_id,
+                options_1=(endpoint_option,),
+            )
+            self._entries[ttl, counter] = entry
+        return entry
 
     def for_service(self, service: Service) -> typing.Optional[Eventgroup]:
         """
@@ -73,13 +114,29 @@ class Eventgroup:
             :attr:`major_version` from service. None if this eventgroup does not match
             the given service.
         """
-        if not self.as_service().matches_offer(service.create_offer_entry()):
-            return None
-        return dataclasses.replace(
-            self,
-            instance_id=service.instance_id,
-            major_version=service.major_version,
+        key = (
+            service.service_id,
+            service.instance_id,
+            service.major_version,
+            service.minor_version,
         )
+        try:
+            return self._for_service[key]
+        except KeyError:
+            pass
+
+        eventgroup: typing.Optional[Eventgroup] = None
+        if self.as_service().matches_offer(service.create_offer_entry()):
+            eventgroup = dataclasses.replace(
+                self,
+                instance_id=service.instance_id,
+                major_version=service.major_version,
+            )
+        # offers from many different service instances should not grow this forever
+        if len(self._for_service) >= _FOR_SERVICE_CACHE_SIZE:
+            self._for_service.clear()
+        self._for_service[key] = eventgroup
+        return eventgroup
 
     def as_service(self):
         """
@@ -96,10 +153,10 @@ class Eventgroup:
     def _sockaddr_to_endpoint(
         sockname: _T_SOCKNAME, protocol: someip.header.L4Protocols
     ) -> someip.header.SOMEIPSDOption:
-        host, port = socket.getnameinfo(
-            sockname, socket.NI_NUMERICHOST | socket.NI_NUMERICSERV
-        )
-        nport = int(port)
+        # sockname already holds the numeric host and port, no need to go through
+        # getnameinfo. strip the scope id from link-local IPv6 addresses
+        host = sockname[0].split("%", 1)[0]
+        nport = sockname[1]
         naddr = ipaddress.ip_address(host)
 
         if isinstance(naddr, ipaddress.IPv4Address):
@@ -121,8 +178,18 @@ class Eventgroup:
         )
 
 
-@dataclasses.dataclass(frozen=True)
-class Service:
+class _ServiceCache(_Cached):
+    __slots__ = ("_entries",)
+
+    # entries are immutable, so created entries are cached per (type, ttl)
+    _entries: typing.Dict[
+        typing.Tuple[someip.header.SOMEIPSDEntryType, int],
+        someip.header.SOMEIPSDEntry,
+    ]
+
+
+@dataclasses.dataclass(frozen=True, **_DATACLASS_SLOTS)
+class Service(_ServiceCache):
     """
     Defines a Service that can be found and offered.
 
@@ -149,6 +216,14 @@ class Service:
 
     eventgroups: typing.FrozenSet[int] = frozenset()
 
+    def __post_init__(self) -> None:
+        object.__setattr__(self, "_entries", {})
+        # freeze options once, so created entries can share them without copying
+        if type(self.options_1) is not tuple:
+            object.__setattr__(self, "options_1", tuple(self.options_1))
+        if type(self.options_2) is not tuple:
+            object.__setattr__(self, "options_2", tuple(self.options_2))
+
     def matches_offer(self, entry: someip.header.SOMEIPSDEntry) -> bool:
         """
         Test if a received OfferService :class:`~someip.header.SOMEIPSDEntry` matches
@@ -160,7 +235,7 @@ class Service:
         :return: True if the given OfferService entry matches this service
         :raises ValueError: if the entry is no OfferService
         """
-        if entry.sd_type != someip.header.SOMEIPSDEntryType.OfferService:
+        if entry.sd_type != _OFFER_SERVICE:
             raise ValueError("entry is no OfferService")
 
         if self.service_id != entry.service_id:
@@ -170,9 +245,10 @@ class Service:
             return False
         if self.major_version != 0xFF and self.major_version != entry.major_version:
             return False
+        # entry type is checked above, skip the service_minor_version property
         if (
             self.minor_version != 0xFFFFFFFF
-            and self.minor_version != entry.service_minor_version
+            and self.minor_version != entry.minver_or_counter
         ):
             return False
         return True
@@ -188,7 +264,7 @@ class Service:
         :return: True if the given FindService entry matches this service
         :raises ValueError: if the entry is no FindService
         """
-        if entry.sd_type != someip.header.SOMEIPSDEntryType.FindService:
+        if entry.sd_type != _FIND_SERVICE:
             raise ValueError("entry is no FindService")
 
         if self.service_id != entry.service_id:
@@ -199,8 +275,8 @@ class Service:
         if entry.major_version != 0xFF and self.major_version != entry.major_version:
             return False
         if (
-            entry.service_minor_version != 0xFFFFFFFF
-            and self.minor_version != entry.service_minor_version
+            entry.minver_or_counter != 0xFFFFFFFF
+            and self.minor_version != entry.minver_or_counter
         ):
             return False
         return True
@@ -217,7 +293,7 @@ class Service:
         :return: True if the given Subscribe entry matches this service
         :raises ValueError: if the entry is no Subscribe
         """
-        if entry.sd_type != someip.header.SOMEIPSDEntryType.Subscribe:
+        if entry.sd_type != _SUBSCRIBE:
             raise ValueError("entry is no Subscribe")
 
         if self.service_id != entry.service_id:
@@ -229,7 +305,8 @@ class Service:
         if self.major_version != 0xFF and self.major_version != entry.major_version:
             return False
 
-        return entry.eventgroup_id in self.eventgroups
+        # entry type is checked above, skip the eventgroup_id property
+        return (entry.minver_or_counter & 0xFFFF) in self.eventgroups
 
     def matches_service(self, other: Service) -> bool:
         """
@@ -274,14 +351,18 @@ class Service:
         :param ttl: the TTL for this FindService entry
         :return: the FindService SD entry for this service
         """
-        return someip.header.SOMEIPSDEntry(
-            sd_type=someip.header.SOMEIPSDEntryType.FindService,
-            service_id=self.service_id,
-            instance_id=self.instance_id,
-            major_version=self.major_version,
-            ttl=ttl,
-            minver_or_counter=self.minor_version,
-        )
+        entry = self._entries.get((_FIND_SERVICE, ttl))
+        if entry is None:
+            entry = someip.header.SOMEIPSDEntry(
+                sd_type=_FIND_SERVICE,
+                service_id=self.service_id,
+                instance_id=self.instance_id,
+                major_version=self.major_version,
+                ttl=ttl,
+                minver_or_counter=self.minor_version,
+            )
+            self._entries[_FIND_SERVICE, ttl] = entry
+        return entry
 
     def create_offer_entry(self, ttl=3):
         """
@@ -290,16 +371,20 @@ class Service:
         :param ttl: the TTL for this FindService entry
         :return: the OfferService SD entry for this service
         """
-        return someip.header.SOMEIPSDEntry(
-            sd_type=someip.header.SOMEIPSDEntryType.OfferService,
-            service_id=self.service_id,
-            instance_id=self.instance_id,
-            major_version=self.major_version,
-            ttl=ttl,
-            minver_or_counter=self.minor_version,
-            options_1=tuple(self.options_1),
-            options_2=tuple(self.options_2),
-        )
+        entry = self._entries.get((_OFFER_SERVICE, ttl))
+        if entry is None:
+            entry = someip.header.SOMEIPSDEntry(
+                sd_type=_OFFER_SERVICE,
+                service_id=self.service_id,
+                instance_id=self.instance_id,
+                major_version=self.major_version,
+                ttl=ttl,
+                minver_or_counter=self.minor_version,
+                options_1=self.options_1,
+                options_2=self.options_2,
+            )
+            self._entries[_OFFER_SERVICE, ttl] = entry
+        return entry
 
     def __str__(self) -> str:  # pragma: nocover
         version = f"{self.major_version}.{self.minor_version}"
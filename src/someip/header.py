@@ -7,19 +7,19 @@ import enum
 import ipaddress
 import struct
 import socket
+import sys
 import typing
 
-try:
-    from functools import cached_property
-except ImportError:  # pragma: nocover
-    cached_property = property  # type: ignore[misc,assignment]
-
-import someip.utils
-
 
 T = typing.TypeVar("T", ipaddress.IPv4Address, ipaddress.IPv6Address)
 _T_SOCKNAME = typing.Union[typing.Tuple[str, int], typing.Tuple[str, int, int, int]]
 
+# instances of the dataclasses below are created for every parsed or built message.
+# use __slots__ where dataclasses supports it (Python 3.10+)
+_DATACLASS_SLOTS: typing.Dict[str, typing.Any] = (
+    {"slots": True} if sys.version_info >= (3, 10) else {}
+)
+
 
 SD_SERVICE = 0xFFFF
 SD_METHOD = 0x8100
@@ -61,21 +61,39 @@ class SOMEIPReturnCode(enum.IntEnum):
     E_WRONG_MESSAGE_TYPE = 10
 
 
+# value -> member lookups, cheaper than calling the IntEnum for every parsed packet
+_MESSAGE_TYPES = {m.value: m for m in SOMEIPMessageType}
+_RETURN_CODES = {m.value: m for m in SOMEIPReturnCode}
+
+
+_SOMEIP_HEADER = struct.Struct("!HHIHHBBBB")
+_SOMEIP_HEADER_PACK_INTO = _SOMEIP_HEADER.pack_into
+_SOMEIP_HEADER_UNPACK = _SOMEIP_HEADER.unpack
+_SOMEIP_HEADER_UNPACK_FROM = _SOMEIP_HEADER.unpack_from
+_SOMEIP_HEADER_SIZE = _SOMEIP_HEADER.size
+# length and session id fields, overwritten when building from a header template
+_SOMEIP_LENGTH_PACK_INTO = struct.Struct("!I").pack_into
+_SOMEIP_SESSION_PACK_INTO = struct.Struct("!H").pack_into
+_SOMEIP_REQUEST_ID_PACK_INTO = struct.Struct("!HH").pack_into
+_U32 = struct.Struct("!I")
+_U32_PACK_INTO = _U32.pack_into
+_U32_UNPACK_FROM = _U32.unpack_from
+
+
 def _unpack(fmt, buf):
     if len(buf) < fmt.size:
         raise IncompleteReadError(
             f"can not parse {fmt.format!r}, got only {len(buf)} bytes"
         )
-    return fmt.unpack(buf[: fmt.size]), buf[fmt.size :]
+    return fmt.unpack_from(buf), buf[fmt.size :]
 
 
-@dataclasses.dataclass(frozen=True)
+@dataclasses.dataclass(frozen=True, **_DATACLASS_SLOTS)
 class SOMEIPHeader:
     """
     Represents a top-level SOMEIP packet (header and payload).
     """
 
-    __format: typing.ClassVar[struct.Struct] = struct.Struct("!HHIHHBBBB")
     service_id: int
     method_id: int
     client_id: int
@@ -116,14 +134,12 @@ payload: {len(self.payload)} bytes"""
         if pv != 1:
             raise ParseError(f"bad someip protocol version 0x{pv:02x}, expected 0x01")
 
-        try:
-            mt = SOMEIPMessageType(mt_b)
-        except ValueError as exc:
-            raise ParseError("bad someip message type {mt_b:#x}") from exc
-        try:
-            rc = SOMEIPReturnCode(rc_b)
-        except ValueError as exc:
-            raise ParseError("bad someip return code {rc_b:#x}") from exc
+        mt = _MESSAGE_TYPES.get(mt_b)
+        if mt is None:
+            raise ParseError(f"bad someip message type {mt_b:#x}")
+        rc = _RETURN_CODES.get(rc_b)
+        if rc is None:
+            raise ParseError(f"bad someip return code {rc_b:#x}")
 
         if size < 8:
             raise ParseError("SOMEIP length must be at least 8")
@@ -157,17 +173,37 @@ payload: {len(self.payload)} bytes"""
         :return: tuple (S, B) where S is the parsed :class:`SOMEIPHeader` instance and B
             is the unparsed rest of `buf`
         """
-        parsed, buf_rest = _unpack(cls.__format, buf)
-        size, builder = cls._parse_header(parsed)
-        if len(buf_rest) < size - 8:
+        parsed, end = cls.parse_from(buf)
+        return parsed, buf[end:]
+
+    @classmethod
+    def parse_from(cls, buf: bytes, offset: int = 0) -> typing.Tuple[SOMEIPHeader, int]:
+        """
+        parses SOMEIP packet in `buf` starting at `offset`. Unlike :meth:`parse`, the
+        rest of the buffer is not copied, so this can be used to parse multiple packets
+        from one buffer.
+
+        :param buf: buffer containing SOMEIP packet
+        :param offset: position of the SOMEIP packet in `buf`
+        :raises IncompleteReadError: see :meth:`parse`
+        :raises ParseError: see :meth:`parse`
+        :return: tuple (S, O) where S is the parsed :class:`SOMEIPHeader` instance and O
+            is the offset of the unparsed rest of `buf`
+        """
+        if len(buf) - offset < _SOMEIP_HEADER_SIZE:
             raise IncompleteReadError(
-                f"packet too short, expected {size+4}, got {len(buf)}"
+                f"can not parse {_SOMEIP_HEADER.format!r},"
+                f" got only {len(buf) - offset} bytes"
+            )
+        size, builder = cls._parse_header(_SOMEIP_HEADER_UNPACK_FROM(buf, offset))
+        # size counts from request id (offset 8) to end of payload
+        end = offset + size + 8
+        if len(buf) < end:
+            raise IncompleteReadError(
+                f"packet too short, expected {end - offset}, got {len(buf) - offset}"
             )
-        payload_b, buf_rest = buf_rest[: size - 8], buf_rest[size - 8 :]
-
-        parsed = builder(payload_b)
 
-        return parsed, buf_rest
+        return builder(buf[offset + _SOMEIP_HEADER_SIZE : end]), end
 
     @classmethod
     async def read(cls, reader: asyncio.StreamReader) -> SOMEIPHeader:
@@ -180,11 +216,12 @@ payload: {len(self.payload)} bytes"""
             message type or return code
         :return: the parsed :class:`SOMEIPHeader` instance
         """
-        hdr_b = await reader.readexactly(cls.__format.size)
-        parsed = cls.__format.unpack(hdr_b)
+        hdr_b = await reader.readexactly(_SOMEIP_HEADER_SIZE)
+        parsed = _SOMEIP_HEADER_UNPACK(hdr_b)
         size, builder = cls._parse_header(parsed)
 
-        payload_b = await reader.readexactly(size - 8)
+        # avoid another suspension for packets without payload
+        payload_b = await reader.readexactly(size - 8) if size > 8 else b""
 
         return builder(payload_b)
 
@@ -195,8 +232,31 @@ payload: {len(self.payload)} bytes"""
         :raises struct.error: if any attribute was out of range for serialization
         :return: the byte representation
         """
+        buf = bytearray(_SOMEIP_HEADER_SIZE + len(self.payload))
+        self.build_into(buf)
+        return bytes(buf)
+
+    def build_into(self, buf: bytearray, offset: int = 0) -> int:
+        """
+        builds the byte representation of this SOMEIP packet into an existing buffer,
+        e.g. to reuse a send buffer or to pack multiple packets into one datagram.
+
+        :param buf: the buffer to write to. Must have room for the header and payload
+            starting at `offset`
+        :param offset: the position in `buf` to start writing at
+        :raises struct.error: if any attribute was out of range for serialization, or
+            the buffer is too small
+        :return: the number of bytes written
+        """
         size = len(self.payload) + 8
-        hdr = self.__format.pack(
+        end = offset + _SOMEIP_HEADER_SIZE + len(self.payload)
+        # check before writing anything, so a failed call leaves buf untouched
+        if len(buf) < end:
+            raise struct.error(f"buffer too small, need {end} bytes, got {len(buf)}")
+        # message_type and return_code are IntEnums, and can be packed as-is
+        _SOMEIP_HEADER_PACK_INTO(
+            buf,
+            offset,
             self.service_id,
             self.method_id,
             size,
@@ -204,10 +264,63 @@ payload: {len(self.payload)} bytes"""
             self.session_id,
             self.protocol_version,
             self.interface_version,
-            self.message_type.value,
-            self.return_code.value,
+            self.message_type,
+            self.return_code,
         )
-        return hdr + self.payload
+        buf[offset + _SOMEIP_HEADER_SIZE : end] = self.payload
+        return end - offset
+
+    def build_template(self) -> bytes:
+        """
+        builds the header bytes of this SOMEIP packet for use with
+        :meth:`build_from_template`, for streams of packets (e.g. notifications) that
+        only differ in :attr:`session_id` and :attr:`payload`.
+
+        :raises struct.error: if any attribute was out of range for serialization
+        :return: the header template
+        """
+        buf = bytearray(_SOMEIP_HEADER_SIZE)
+        _SOMEIP_HEADER_PACK_INTO(
+            buf,
+            0,
+            self.service_id,
+            self.method_id,
+            8,
+            self.client_id,
+            self.session_id,
+            self.protocol_version,
+            self.interface_version,
+            self.message_type,
+            self.return_code,
+        )
+        return bytes(buf)
+
+    @staticmethod
+    def build_from_template(
+        template: bytes,
+        session_id: int,
+        payload: bytes,
+        buf: typing.Optional[bytearray] = None,
+    ) -> bytearray:
+        """
+        builds the byte representation of a SOMEIP packet from a header template
+        created by :meth:`build_template`, only filling in the session id and length.
+
+        :param template: the header template
+        :param session_id: session id of the new packet
+        :param payload: payload of the new packet
+        :param buf: if given, the packet is appended to this buffer
+        :raises struct.error: if `session_id` is out of range
+        :return: the buffer holding the packet
+        """
+        if buf is None:
+            buf = bytearray()
+        offset = len(buf)
+        buf += template
+        buf += payload
+        _SOMEIP_LENGTH_PACK_INTO(buf, offset + 4, len(payload) + 8)
+        _SOMEIP_SESSION_PACK_INTO(buf, offset + 10, session_id)
+        return buf
 
 
 class SOMEIPReader:
@@ -219,8 +332,14 @@ class SOMEIPReader:
     def __init__(self, reader: asyncio.StreamReader):
         self.reader = reader
 
-    async def read(self) -> typing.Optional[SOMEIPHeader]:
-        return await SOMEIPHeader.read(self.reader)
+    def read(self) -> typing.Awaitable[typing.Optional[SOMEIPHeader]]:
+        """
+        reads the next SOMEIP packet, see :meth:`SOMEIPHeader.read`.
+
+        Returns the :meth:`SOMEIPHeader.read` coroutine directly instead of wrapping it
+        in another coroutine for every packet.
+        """
+        return SOMEIPHeader.read(self.reader)
 
     def at_eof(self):
         return self.reader.at_eof()
@@ -233,31 +352,46 @@ class SOMEIPSDEntryType(enum.IntEnum):
     SubscribeAck = 7
 
 
+_SD_ENTRY = struct.Struct("!BBBBHHBBHI")
+_SD_ENTRY_PACK_INTO = _SD_ENTRY.pack_into
+_SD_ENTRY_SIZE = _SD_ENTRY.size
+_SD_ENTRY_TYPES = {t.value: t for t in SOMEIPSDEntryType}
+_SD_SERVICE_TYPES = frozenset(
+    (SOMEIPSDEntryType.FindService, SOMEIPSDEntryType.OfferService)
+)
+_SD_SUBSCRIBE_TYPES = frozenset(
+    (SOMEIPSDEntryType.Subscribe, SOMEIPSDEntryType.SubscribeAck)
+)
+
+
 def _find(haystack, needle):
-    """Return the index at which the sequence needle appears in the sequence haystack,
-    or -1 if it is not found, using the Boyer-Moore-Horspool algorithm. The elements of
-    needle and haystack must be hashable.
+    """Return the index at which the sequence needle appears in the list haystack,
+    or None if it is not found. Candidate positions are located with
+    :meth:`list.index`, which is faster than a skip table for the short option runs
+    this is used with.
 
-    >>> find([1, 1, 2], [1, 2])
+    >>> _find([1, 1, 2], [1, 2])
     1
-
-    from https://codereview.stackexchange.com/a/19629
     """
-    h = len(haystack)
     n = len(needle)
-    skip = {needle[i]: n - i - 1 for i in range(n - 1)}
-    i = n - 1
-    while i < h:
-        for j in range(n):
-            if haystack[i - j] != needle[-j - 1]:
-                i += skip.get(haystack[i], n)
-                break
-        else:
-            return i - n + 1
+    if not n:
+        return 0
+    needle = list(needle)
+    first = needle[0]
+    stop = len(haystack) - n + 1
+    i = 0
+    while i < stop:
+        try:
+            i = haystack.index(first, i, stop)
+        except ValueError:
+            return None
+        if n == 1 or haystack[i : i + n] == needle:
+            return i
+        i += 1
     return None
 
 
-@dataclasses.dataclass(frozen=True)
+@dataclasses.dataclass(frozen=True, **_DATACLASS_SLOTS)
 class SOMEIPSDEntry:
     """
     Represents an Entry in SOMEIP SD packets.
@@ -276,7 +410,6 @@ class SOMEIPSDEntry:
     :param num_options_2: number of option (for unresolved options, run 2)
     """
 
-    __format: typing.ClassVar[struct.Struct] = struct.Struct("!BBBBHHBBHI")
     sd_type: SOMEIPSDEntryType
     service_id: int
     instance_id: int
@@ -293,15 +426,9 @@ class SOMEIPSDEntry:
     num_options_2: typing.Optional[int] = None
 
     def __str__(self) -> str:  # pragma: nocover
-        if self.sd_type in (
-            SOMEIPSDEntryType.FindService,
-            SOMEIPSDEntryType.OfferService,
-        ):
+        if self.sd_type in _SD_SERVICE_TYPES:
             version = f"{self.major_version}.{self.service_minor_version}"
-        elif self.sd_type in (
-            SOMEIPSDEntryType.Subscribe,
-            SOMEIPSDEntryType.SubscribeAck,
-        ):
+        elif self.sd_type in _SD_SUBSCRIBE_TYPES:
             version = (
                 f"{self.major_version}, eventgroup_counter={self.eventgroup_counter},"
                 f" eventgroup_id={self.eventgroup_id}"
@@ -324,7 +451,7 @@ class SOMEIPSDEntry:
             f" options_1=[{s_options_1}], options_2=[{s_options_2}]"
         )
 
-    @cached_property
+    @property
     def options(self) -> typing.Tuple[SOMEIPSDOption, ...]:
         """
         convenience wrapper contains merged :attr:`options_1` and :attr:`options_2`
@@ -360,14 +487,17 @@ class SOMEIPSDEntry:
         no1 = typing.cast(int, self.num_options_1)
         no2 = typing.cast(int, self.num_options_2)
 
-        return dataclasses.replace(
-            self,
-            options_1=options[oi1 : oi1 + no1],
-            options_2=options[oi2 : oi2 + no2],
-            option_index_1=None,
-            option_index_2=None,
-            num_options_1=None,
-            num_options_2=None,
+        # many entries carry no options at all. construct directly instead of going
+        # through dataclasses.replace, this runs for every received entry
+        return self.__class__(
+            sd_type=self.sd_type,
+            service_id=self.service_id,
+            instance_id=self.instance_id,
+            major_version=self.major_version,
+            ttl=self.ttl,
+            minver_or_counter=self.minver_or_counter,
+            options_1=options[oi1 : oi1 + no1] if no1 else (),
+            options_2=options[oi2 : oi2 + no2] if no2 else (),
         )
 
     @staticmethod
@@ -398,14 +528,17 @@ class SOMEIPSDEntry:
 
         oi1, no1 = self._assign_option(self.options_1, options)
         oi2, no2 = self._assign_option(self.options_2, options)
-        return dataclasses.replace(
-            self,
+        return self.__class__(
+            sd_type=self.sd_type,
+            service_id=self.service_id,
+            instance_id=self.instance_id,
+            major_version=self.major_version,
+            ttl=self.ttl,
+            minver_or_counter=self.minver_or_counter,
             option_index_1=oi1,
             option_index_2=oi2,
             num_options_1=no1,
             num_options_2=no2,
-            options_1=(),
-            options_2=(),
         )
 
     @property
@@ -415,10 +548,7 @@ class SOMEIPSDEntry:
 
         :raises TypeError: if this entry is not a FindService or OfferService
         """
-        if self.sd_type not in (
-            SOMEIPSDEntryType.FindService,
-            SOMEIPSDEntryType.OfferService,
-        ):
+        if self.sd_type not in _SD_SERVICE_TYPES:
             raise TypeError(
                 f"SD entry is type {self.sd_type},"
                 " does not have service_minor_version"
@@ -432,10 +562,7 @@ class SOMEIPSDEntry:
 
         :raises TypeError: if this entry is not a Subscribe or SubscribeAck
         """
-        if self.sd_type not in (
-            SOMEIPSDEntryType.Subscribe,
-            SOMEIPSDEntryType.SubscribeAck,
-        ):
+        if self.sd_type not in _SD_SUBSCRIBE_TYPES:
             raise TypeError(
                 f"SD entry is type {self.sd_type}, does not have eventgroup_counter"
             )
@@ -448,10 +575,7 @@ class SOMEIPSDEntry:
 
         :raises TypeError: if this entry is not a Subscribe or SubscribeAck
         """
-        if self.sd_type not in (
-            SOMEIPSDEntryType.Subscribe,
-            SOMEIPSDEntryType.SubscribeAck,
-        ):
+        if self.sd_type not in _SD_SUBSCRIBE_TYPES:
             raise TypeError(
                 f"SD entry is type {self.sd_type}, does not have eventgroup_id"
             )
@@ -470,18 +594,20 @@ class SOMEIPSDEntry:
         :return: tuple (S, B) where S is the parsed :class:`SOMEIPSDEntry` instance and
             B is the unparsed rest of `buf`
         """
-        (
-            (sd_type_b, oi1, oi2, numopt, sid, iid, majv, ttl_hi, ttl_lo, val),
-            buf_rest,
-        ) = _unpack(cls.__format, buf)
-        try:
-            sd_type = SOMEIPSDEntryType(sd_type_b)
-        except ValueError as exc:
-            raise ParseError("bad someip sd entry type {sd_type_b:#x}") from exc
+        fields, buf_rest = _unpack(_SD_ENTRY, buf)
+        return cls._from_fields(fields, num_options), buf_rest
+
+    @classmethod
+    def _from_fields(
+        cls, fields: typing.Tuple[int, ...], num_options: int
+    ) -> SOMEIPSDEntry:
+        sd_type_b, oi1, oi2, numopt, sid, iid, majv, ttl_hi, ttl_lo, val = fields
+        sd_type = _SD_ENTRY_TYPES.get(sd_type_b)
+        if sd_type is None:
+            raise ParseError(f"bad someip sd entry type {sd_type_b:#x}")
 
         no1 = numopt >> 4
         no2 = numopt & 0x0F
-        ttl = (ttl_hi << 16) | ttl_lo
 
         if oi1 + no1 > num_options:
             raise ParseError(
@@ -493,14 +619,14 @@ class SOMEIPSDEntry:
                 f"SD entry options_2 ({oi2}:{oi2+no2}) out of range ({num_options})"
             )
 
-        if sd_type in (SOMEIPSDEntryType.Subscribe, SOMEIPSDEntryType.SubscribeAck):
+        if sd_type in _SD_SUBSCRIBE_TYPES:
             if val & 0xFFF00000:
                 raise ParseError(
                     "expected counter and eventgroup_id to be 4 + 16-bit"
                     " with 12 upper bits zeros"
                 )
 
-        parsed = cls(
+        return cls(
             sd_type=sd_type,
             option_index_1=oi1,
             option_index_2=oi2,
@@ -509,12 +635,10 @@ class SOMEIPSDEntry:
             service_id=sid,
             instance_id=iid,
             major_version=majv,
-            ttl=ttl,
+            ttl=(ttl_hi << 16) | ttl_lo,
             minver_or_counter=val,
         )
 
-        return parsed, buf_rest
-
     def build(self) -> bytes:
         """
         build the byte representation of this entry.
@@ -524,14 +648,33 @@ class SOMEIPSDEntry:
         :raises struct.error: if any attribute was out of range for serialization
         :return: the byte representation
         """
-        if self.options_resolved:
+        buf = bytearray(_SD_ENTRY_SIZE)
+        self.build_into(buf)
+        return bytes(buf)
+
+    def build_into(self, buf: bytearray, offset: int = 0) -> int:
+        """
+        builds the byte representation of this entry into an existing buffer.
+
+        :param buf: the buffer to write to
+        :param offset: the position in `buf` to start writing at
+        :raises ValueError: if the option indexes on this entry were not resolved.
+            see :meth:`assign_option_index`
+        :raises struct.error: if any attribute was out of range for serialization, or
+            the buffer is too small
+        :return: the number of bytes written
+        """
+        # same check as options_resolved, on the values needed below anyway
+        oi1 = self.option_index_1
+        oi2 = self.option_index_2
+        no1 = self.num_options_1
+        no2 = self.num_options_2
+        if oi1 is None or oi2 is None or no1 is None or no2 is None:
             raise ValueError("option indexes must be assigned before building")
-        oi1 = typing.cast(int, self.option_index_1)
-        oi2 = typing.cast(int, self.option_index_2)
-        no1 = typing.cast(int, self.num_options_1)
-        no2 = typing.cast(int, self.num_options_2)
-        return self.__format.pack(
-            self.sd_type.value,
+        _SD_ENTRY_PACK_INTO(
+            buf,
+            offset,
+            self.sd_type,
             oi1,
             oi2,
             (no1 << 4) | no2,
@@ -542,6 +685,15 @@ class SOMEIPSDEntry:
             self.ttl & 0xFFFF,
             self.minver_or_counter,
         )
+        return _SD_ENTRY_SIZE
+
+
+# option classes indexed by their (8 bit) option type, filled by
+# SOMEIPSDOption.register. a list index is cheaper than a dict lookup
+_T_OPTION_CLS = typing.Optional[typing.Type["SOMEIPSDAbstractOption"]]
+_OPTION_TYPES: typing.List[_T_OPTION_CLS] = [None] * 256
+_OPTION_HEADER = struct.Struct("!HB")
+_OPTION_HEADER_UNPACK_FROM = _OPTION_HEADER.unpack_from
 
 
 class SOMEIPSDOption(metaclass=abc.ABCMeta):
@@ -549,10 +701,12 @@ class SOMEIPSDOption(metaclass=abc.ABCMeta):
     Abstract base class representing SD options
     """
 
-    __format: typing.ClassVar[struct.Struct] = struct.Struct("!HB")
-    _options: typing.ClassVar[
-        typing.Dict[int, typing.Type[SOMEIPSDAbstractOption]]
-    ] = {}
+    __slots__ = ("_built",)
+
+    # set by :attr:`built` on first access
+    _built: bytes
+
+    _options: typing.ClassVar[typing.List[_T_OPTION_CLS]] = _OPTION_TYPES
 
     @classmethod
     def register(
@@ -562,7 +716,7 @@ class SOMEIPSDOption(metaclass=abc.ABCMeta):
         Decorator for SD option classes, to register them for option parsing, identified
         by their :attr:`SOMEIPSDAbstractOption.type` members.
         """
-        cls._options[option_cls.type] = option_cls
+        _OPTION_TYPES[option_cls.type] = option_cls
         return option_cls
 
     @classmethod
@@ -579,18 +733,41 @@ class SOMEIPSDOption(metaclass=abc.ABCMeta):
         :return: tuple (S, B) where S is the parsed :class:`SOMEIPSDOption` instance and
             B is the unparsed rest of `buf`
         """
-        (len_b, type_b), buf_rest = _unpack(cls.__format, buf)
-        if len(buf_rest) < len_b:
+        parsed, end = cls.parse_from(buf)
+        return parsed, buf[end:]
+
+    @classmethod
+    def parse_from(
+        cls, buf: bytes, offset: int = 0
+    ) -> typing.Tuple[SOMEIPSDOption, int]:
+        """
+        parses SOMEIP SD option in `buf` starting at `offset`, see :meth:`parse`.
+
+        :param buf: buffer containing SOMEIP SD option
+        :param offset: position of the option in `buf`
+        :raises ParseError: see :meth:`parse`
+        :return: tuple (S, O) where S is the parsed :class:`SOMEIPSDOption` instance and
+            O is the offset of the unparsed rest of `buf`
+        """
+        if len(buf) - offset < 3:
+            raise IncompleteReadError(
+                f"can not parse {_OPTION_HEADER.format!r},"
+                f" got only {len(buf) - offset} bytes"
+            )
+        len_b, type_b = _OPTION_HEADER_UNPACK_FROM(buf, offset)
+        start = offset + 3
+        end = start + len_b
+        if len(buf) < end:
             raise ParseError(
-                f"option data too short, expected {len_b}, got {buf_rest!r}"
+                f"option data too short, expected {len_b}, got {buf[start:]!r}"
             )
-        opt_b, buf_rest = buf_rest[:len_b], buf_rest[len_b:]
+        opt_b = buf[start:end]
 
-        opt_cls = cls._options.get(type_b)
+        opt_cls = _OPTION_TYPES[type_b]
         if not opt_cls:
-            return SOMEIPSDUnknownOption(type=type_b, payload=opt_b), buf_rest
+            return SOMEIPSDUnknownOption(type=type_b, payload=opt_b), end
 
-        return opt_cls.parse_option(opt_b), buf_rest
+        return opt_cls.parse_option(opt_b), end
 
     def build_option(self, type_b: int, buf: bytes) -> bytes:
         """
@@ -602,7 +779,20 @@ class SOMEIPSDOption(metaclass=abc.ABCMeta):
             out of range
         :return: the byte representation
         """
-        return self.__format.pack(len(buf), type_b) + buf
+        return _OPTION_HEADER.pack(len(buf), type_b) + buf
+
+    @property
+    def built(self) -> bytes:
+        """
+        the byte representation of this option as returned by :meth:`build`. Options
+        are immutable, so it is only built on first access.
+        """
+        try:
+            return self._built
+        except AttributeError:
+            built = self.build()
+            object.__setattr__(self, "_built", built)
+            return built
 
     @abc.abstractmethod
     def build(self) -> bytes:
@@ -616,7 +806,7 @@ class SOMEIPSDOption(metaclass=abc.ABCMeta):
         ...
 
 
-@dataclasses.dataclass(frozen=True)
+@dataclasses.dataclass(frozen=True, **_DATACLASS_SLOTS)
 class SOMEIPSDUnknownOption(SOMEIPSDOption):
     """
     Received options with unknown option types are parsed as this generic class.
@@ -644,6 +834,8 @@ class SOMEIPSDAbstractOption(SOMEIPSDOption):
     Base class for specific option implementations.
     """
 
+    __slots__ = ()
+
     type: typing.ClassVar[int]
     """
     Class variable. Used to differentiate SD option types when parsing. See
@@ -664,7 +856,7 @@ class SOMEIPSDAbstractOption(SOMEIPSDOption):
 
 
 @SOMEIPSDOption.register
-@dataclasses.dataclass(frozen=True)
+@dataclasses.dataclass(frozen=True, **_DATACLASS_SLOTS)
 class SOMEIPSDLoadBalancingOption(SOMEIPSDAbstractOption):
     type: typing.ClassVar[int] = 2
     priority: int
@@ -693,8 +885,40 @@ class SOMEIPSDLoadBalancingOption(SOMEIPSDAbstractOption):
         )
 
 
+def _parse_configs(
+    buf: bytes, pos: int = 0
+) -> typing.Tuple[typing.Tuple[str, typing.Optional[str]], ...]:
+    """
+    parses the length-prefixed, zero-terminated configuration string of a
+    :class:`SOMEIPSDConfigOption`, starting at `pos`. Walks `buf` by offset instead of
+    re-slicing the remaining buffer for every entry.
+    """
+    configs: typing.List[typing.Tuple[str, typing.Optional[str]]] = []
+    end = len(buf)
+
+    nextlen = buf[pos]
+    pos += 1
+    while nextlen != 0:
+        if end - pos < nextlen + 1:
+            raise ParseError(
+                f"SD config option length {nextlen} too big for remaining"
+                f" option buffer {buf[pos:]!r}"
+            )
+
+        key, sep, value = buf[pos : pos + nextlen].partition(b"=")
+        if sep:
+            configs.append((key.decode("ascii"), value.decode("ascii")))
+        else:
+            configs.append((key.decode("ascii"), None))
+
+        pos += nextlen
+        nextlen = buf[pos]
+        pos += 1
+    return tuple(configs)
+
+
 @SOMEIPSDOption.register
-@dataclasses.dataclass(frozen=True)
+@dataclasses.dataclass(frozen=True, **_DATACLASS_SLOTS)
 class SOMEIPSDConfigOption(SOMEIPSDAbstractOption):
     type: typing.ClassVar[int] = 1
     configs: typing.Tuple[typing.Tuple[str, typing.Optional[str]], ...]
@@ -706,28 +930,8 @@ class SOMEIPSDConfigOption(SOMEIPSDAbstractOption):
                 f"SD config option with wrong payload length {len(buf)} < 2"
             )
 
-        b = buf[1:]
-        nextlen, b = b[0], b[1:]
-
-        configs: typing.List[typing.Tuple[str, typing.Optional[str]]] = []
-
-        while nextlen != 0:
-            if len(b) < nextlen + 1:
-                raise ParseError(
-                    f"SD config option length {nextlen} too big for remaining"
-                    f" option buffer {b!r}"
-                )
-
-            cfg_str, b = b[:nextlen], b[nextlen:]
-
-            split = cfg_str.find(b"=")
-            if split == -1:
-                configs.append((cfg_str.decode("ascii"), None))
-            else:
-                key, value = cfg_str[:split], cfg_str[split + 1 :]
-                configs.append((key.decode("ascii"), value.decode("ascii")))
-            nextlen, b = b[0], b[1:]
-        return cls(configs=tuple(configs))
+        # skip reserved byte
+        return cls(configs=_parse_configs(buf, 1))
 
     def build(self) -> bytes:
         """
@@ -737,18 +941,16 @@ class SOMEIPSDConfigOption(SOMEIPSDAbstractOption):
             :attr:`type` is out of range
         :return: the byte representation
         """
-        buf = bytearray([0])
+        parts = [b"\x00"]
         for k, v in self.configs:
             if v is not None:
-                buf.append(len(k) + len(v) + 1)
-                buf += k.encode("ascii")
-                buf += b"="
-                buf += v.encode("ascii")
+                cfg = b"%s=%s" % (k.encode("ascii"), v.encode("ascii"))
             else:
-                buf.append(len(k))
-                buf += k.encode("ascii")
-        buf.append(0)
-        return self.build_option(self.type, buf)
+                cfg = k.encode("ascii")
+            parts.append(bytes((len(cfg),)))
+            parts.append(cfg)
+        parts.append(b"\x00")
+        return self.build_option(self.type, b"".join(parts))
 
 
 class L4Protocols(enum.IntEnum):
@@ -760,8 +962,20 @@ class L4Protocols(enum.IntEnum):
     UDP = socket.IPPROTO_UDP
 
 
-@dataclasses.dataclass(frozen=True)
-class AbstractIPOption(SOMEIPSDAbstractOption, typing.Generic[T]):
+_L4PROTOCOLS = {p.value: p for p in L4Protocols}
+
+
+class _IPOptionCache(SOMEIPSDAbstractOption):
+    # cached representations of the address, set by AbstractIPOption.__post_init__.
+    # declared outside of the dataclass so they don't become dataclass fields
+    __slots__ = ("_packed", "_str")
+
+    _packed: bytes
+    _str: str
+
+
+@dataclasses.dataclass(frozen=True, **_DATACLASS_SLOTS)
+class AbstractIPOption(_IPOptionCache, typing.Generic[T]):
     """
     Abstract base class for options with IP payloads. Generalizes parsing and building
     based on :attr:`_format`, :attr:`_address_type` and :attr:`_family`.
@@ -774,20 +988,40 @@ class AbstractIPOption(SOMEIPSDAbstractOption, typing.Generic[T]):
     l4proto: typing.Union[L4Protocols, int]
     port: int
 
+    # bound methods of _format, cached per subclass by __init_subclass__
+    _size: typing.ClassVar[int]
+    _pack: typing.ClassVar[typing.Callable[..., bytes]]
+    _unpack: typing.ClassVar[typing.Callable[[bytes], typing.Tuple[typing.Any, ...]]]
+
+    def __init_subclass__(cls, **kwargs: typing.Any) -> None:
+        # zero-argument super() would refer to the class before dataclass added slots
+        super(AbstractIPOption, cls).__init_subclass__(**kwargs)
+        if "_format" in cls.__dict__:
+            cls._size = cls._format.size
+            cls._pack = cls._format.pack
+            cls._unpack = cls._format.unpack
+
+    def __post_init__(self) -> None:
+        object.__setattr__(self, "_packed", self.address.packed)
+        object.__setattr__(self, "_str", str(self.address))
+
+    def __reduce__(self) -> typing.Tuple[typing.Any, ...]:
+        # the default (slots) pickle state only holds the fields, go through __init__
+        # so that the cached address representations are set
+        return (self.__class__, (self.address, self.l4proto, self.port))
+
     @classmethod
     def parse_option(cls, buf: bytes) -> AbstractIPOption[T]:
-        if len(buf) != cls._format.size:
+        if len(buf) != cls._size:
             raise ParseError(
-                f"{cls.__name__} with wrong payload length {len(buf)} != 9"
+                f"{cls.__name__} with wrong payload length {len(buf)} != {cls._size}"
             )
 
-        r1, addr_b, r2, l4proto_b, port = cls._format.unpack(buf)
+        r1, addr_b, r2, l4proto_b, port = cls._unpack(buf)
 
         addr = cls._address_type(addr_b)
-        try:
-            l4proto = L4Protocols(l4proto_b)
-        except ValueError:
-            l4proto = l4proto_b
+        # unknown protocols are kept as plain int
+        l4proto = _L4PROTOCOLS.get(l4proto_b, l4proto_b)
 
         return cls(address=addr, l4proto=l4proto, port=port)
 
@@ -799,7 +1033,7 @@ class AbstractIPOption(SOMEIPSDAbstractOption, typing.Generic[T]):
             :attr:`type` is out of range
         :return: the byte representation
         """
-        payload = self._format.pack(0, self.address.packed, 0, self.l4proto, self.port)
+        payload = self._pack(0, self._packed, 0, self.l4proto, self.port)
         return self.build_option(self.type, payload)
 
     async def addrinfo(self) -> _T_SOCKNAME:
@@ -807,18 +1041,14 @@ class AbstractIPOption(SOMEIPSDAbstractOption, typing.Generic[T]):
         return address info for this IP option for use in socket-based functions, e.g.,
         :meth:`socket.connect` or :meth:`socket.sendto`.
 
-        :raises socket.gaierror: if the call to `getaddrinfo` failed or returned no
-            result
-        :returns: the first resolved sockaddr tuple
+        The address is always numeric, so the sockaddr tuple is built directly instead
+        of calling `getaddrinfo`.
+
+        :returns: the sockaddr tuple
         """
-        addr = await someip.utils.getfirstaddrinfo(
-            str(self.address),
-            self.port,
-            family=self._family,
-            proto=self.l4proto,
-            flags=socket.AI_NUMERICHOST | socket.AI_NUMERICSERV,
-        )
-        return typing.cast(_T_SOCKNAME, addr[4])
+        if self._family == socket.AF_INET6:
+            return (self._str, self.port, 0, 0)
+        return (self._str, self.port)
 
 
 class EndpointOption(AbstractIPOption[T]):
@@ -826,7 +1056,7 @@ class EndpointOption(AbstractIPOption[T]):
     Abstract base class for endpoint options (IPv4 or IPv6).
     """
 
-    pass
+    __slots__ = ()
 
 
 class MulticastOption(AbstractIPOption[T]):
@@ -834,7 +1064,7 @@ class MulticastOption(AbstractIPOption[T]):
     Abstract base class for multicast options (IPv4 or IPv6).
     """
 
-    pass
+    __slots__ = ()
 
 
 class SDEndpointOption(AbstractIPOption[T]):
@@ -842,7 +1072,7 @@ class SDEndpointOption(AbstractIPOption[T]):
     Abstract base class for SD Endpoint options (IPv4 or IPv6).
     """
 
-    pass
+    __slots__ = ()
 
 
 class AbstractIPv4Option(AbstractIPOption[ipaddress.IPv4Address]):
@@ -850,15 +1080,17 @@ class AbstractIPv4Option(AbstractIPOption[ipaddress.IPv4Address]):
     Abstract base class for IPv4 options.
     """
 
+    __slots__ = ()
+
     _format: typing.ClassVar[struct.Struct] = struct.Struct("!B4sBBH")
     _address_type = ipaddress.IPv4Address
     _family = socket.AF_INET
 
     def __str__(self) -> str:  # pragma: nocover
         if isinstance(self.l4proto, L4Protocols):
-            return f"{self.address}:{self.port} ({self.l4proto.name})"
+            return f"{self._str}:{self.port} ({self.l4proto.name})"
         else:
-            return f"{self.address}:{self.port} (protocol={self.l4proto:#x})"
+            return f"{self._str}:{self.port} (protocol={self.l4proto:#x})"
 
 
 class AbstractIPv6Option(AbstractIPOption[ipaddress.IPv6Address]):
@@ -866,29 +1098,35 @@ class AbstractIPv6Option(AbstractIPOption[ipaddress.IPv6Address]):
     Abstract base class for IPv6 options.
     """
 
+    __slots__ = ()
+
     _format: typing.ClassVar[struct.Struct] = struct.Struct("!B16sBBH")
     _address_type = ipaddress.IPv6Address
     _family = socket.AF_INET6
 
     def __str__(self) -> str:  # pragma: nocover
         if isinstance(self.l4proto, L4Protocols):
-            return f"{self.address}:{self.port} ({self.l4proto.name})"
+            return f"{self._str}:{self.port} ({self.l4proto.name})"
         else:
-            return f"{self.address}:{self.port} (protocol={self.l4proto:#x})"
+            return f"{self._str}:{self.port} (protocol={self.l4proto:#x})"
 
 
 @SOMEIPSDOption.register
 class IPv4EndpointOption(AbstractIPv4Option, EndpointOption[ipaddress.IPv4Address]):
     type: typing.ClassVar[int] = 0x04
 
+    __slots__ = ()
+
 
 @SOMEIPSDOption.register
 class IPv4MulticastOption(AbstractIPv4Option, MulticastOption[ipaddress.IPv4Address]):
     type: typing.ClassVar[int] = 0x14
 
+    __slots__ = ()
+
 
 @SOMEIPSDOption.register
-@dataclasses.dataclass(frozen=True)
+@dataclasses.dataclass(frozen=True, **_DATACLASS_SLOTS)
 class IPv4SDEndpointOption(AbstractIPv4Option, SDEndpointOption[ipaddress.IPv4Address]):
     type: typing.ClassVar[int] = 0x24
 
@@ -897,19 +1135,23 @@ class IPv4SDEndpointOption(AbstractIPv4Option, SDEndpointOption[ipaddress.IPv4Ad
 class IPv6EndpointOption(AbstractIPv6Option, EndpointOption[ipaddress.IPv6Address]):
     type: typing.ClassVar[int] = 0x06
 
+    __slots__ = ()
+
 
 @SOMEIPSDOption.register
 class IPv6MulticastOption(AbstractIPv6Option, MulticastOption[ipaddress.IPv6Address]):
     type: typing.ClassVar[int] = 0x16
 
+    __slots__ = ()
+
 
 @SOMEIPSDOption.register
-@dataclasses.dataclass(frozen=True)
+@dataclasses.dataclass(frozen=True, **_DATACLASS_SLOTS)
 class IPv6SDEndpointOption(AbstractIPv6Option, SDEndpointOption[ipaddress.IPv6Address]):
     type: typing.ClassVar[int] = 0x26
 
 
-@dataclasses.dataclass(frozen=True)
+@dataclasses.dataclass(frozen=True, **_DATACLASS_SLOTS)
 class SOMEIPSDHeader:
     """
     Represents a SOMEIP SD packet.
@@ -928,8 +1170,15 @@ class SOMEIPSDHeader:
         :return: a new :class:`SOMEIPSDHeader` instance with entries with resolved
             options
         """
-        entries = [e.resolve_options(self.options) for e in self.entries]
-        return dataclasses.replace(self, entries=tuple(entries))
+        options = self.options
+        entries = [e.resolve_options(options) for e in self.entries]
+        return self.__class__(
+            entries=tuple(entries),
+            options=options,
+            flag_reboot=self.flag_reboot,
+            flag_unicast=self.flag_unicast,
+            flags_unknown=self.flags_unknown,
+        )
 
     def assign_option_indexes(self):
         """
@@ -940,7 +1189,13 @@ class SOMEIPSDHeader:
         """
         options = list(self.options)
         entries = [e.assign_option_index(options) for e in self.entries]
-        return dataclasses.replace(self, entries=tuple(entries), options=tuple(options))
+        return self.__class__(
+            entries=tuple(entries),
+            options=tuple(options),
+            flag_reboot=self.flag_reboot,
+            flag_unicast=self.flag_unicast,
+            flags_unknown=self.flags_unknown,
+        )
 
     def __str__(self):  # pragma: nocover
         entries = "\n".join(str(e) for e in self.entries)
@@ -964,33 +1219,52 @@ class SOMEIPSDHeader:
 
         flags = buf[0]
 
-        entries_length = struct.unpack("!I", buf[4:8])[0]
-        rest_buf = buf[8:]
-        if len(rest_buf) < entries_length + 4:
+        entries_length = _U32_UNPACK_FROM(buf, 4)[0]
+        entries_end = 8 + entries_length
+        if len(buf) < entries_end + 4:
             raise ParseError(
                 f"can not parse SOMEIPSDHeader, entries length too big"
                 f" ({entries_length})"
             )
-        entries_buffer, rest_buf = rest_buf[:entries_length], rest_buf[entries_length:]
 
-        options_length = struct.unpack("!I", rest_buf[:4])[0]
-        rest_buf = rest_buf[4:]
-        if len(rest_buf) < options_length:
+        options_length = _U32_UNPACK_FROM(buf, entries_end)[0]
+        options_end = entries_end + 4 + options_length
+        if len(buf) < options_end:
             raise ParseError(
                 f"can not parse SOMEIPSDHeader, options length too big"
                 f" ({options_length}"
             )
-        options_buffer, rest_buf = rest_buf[:options_length], rest_buf[options_length:]
+        rest_buf = buf[options_end:] if len(buf) > options_end else b""
 
+        # options are parsed in place, only checking that the last one did not run
+        # past the options array
         options = []
-        while options_buffer:
-            option, options_buffer = SOMEIPSDOption.parse(options_buffer)
+        parse_option = SOMEIPSDOption.parse_from
+        offset = entries_end + 4
+        while offset < options_end:
+            option, offset = parse_option(buf, offset)
             options.append(option)
+        if offset > options_end:
+            raise ParseError(
+                f"option data too long, options array ends at {options_end},"
+                f" last option ends at {offset}"
+            )
 
-        entries = []
-        while entries_buffer:
-            entry, entries_buffer = SOMEIPSDEntry.parse(entries_buffer, len(options))
-            entries.append(entry)
+        num_options = len(options)
+        if entries_length % _SD_ENTRY_SIZE == 0:
+            # unpack all entries in one go, from a view to avoid copying the array
+            from_fields = SOMEIPSDEntry._from_fields
+            entries = [
+                from_fields(fields, num_options)
+                for fields in _SD_ENTRY.iter_unpack(memoryview(buf)[8:entries_end])
+            ]
+        else:
+            # let SOMEIPSDEntry.parse raise on the incomplete trailing entry
+            entries = []
+            entries_buffer = buf[8:entries_end]
+            while entries_buffer:
+                entry, entries_buffer = SOMEIPSDEntry.parse(entries_buffer, num_options)
+                entries.append(entry)
 
         flag_reboot = bool(flags & 0x80)
         flags &= ~0x80
@@ -1023,14 +1297,23 @@ class SOMEIPSDHeader:
         if self.flag_unicast:
             flags |= 0x40
 
-        buf = bytearray([flags, 0, 0, 0])
-
-        entries_buf = b"".join(e.build() for e in self.entries)
-        options_buf = b"".join(e.build() for e in self.options)
-
-        buf += struct.pack("!I", len(entries_buf))
-        buf += entries_buf
-        buf += struct.pack("!I", len(options_buf))
-        buf += options_buf
+        options_bufs = [o.built for o in self.options]
+        options_length = sum(map(len, options_bufs))
+        entries_length = len(self.entries) * _SD_ENTRY_SIZE
+
+        # the message is allocated once: entries are packed straight into it, options
+        # are copied from the bytes cached on the (usually long-lived) option instances
+        buf = bytearray(12 + entries_length + options_length)
+        buf[0] = flags
+        _U32_PACK_INTO(buf, 4, entries_length)
+        offset = 8
+        for e in self.entries:
+            offset += e.build_into(buf, offset)
+        _U32_PACK_INTO(buf, offset, options_length)
+        offset += 4
+        for option_buf in options_bufs:
+            end = offset + len(option_buf)
+            buf[offset:end] = option_buf
+            offset = end
 
         return buf
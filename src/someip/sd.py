@@ -3,6 +3,7 @@ from __future__ import annotations
 import asyncio
 import collections
 import dataclasses
+import functools
 import ipaddress
 import itertools
 import logging
@@ -12,12 +13,15 @@ import random
 import socket
 import struct
 import threading
+import types
 import typing
+import warnings
 
 import someip.header
 import someip.config
 from someip.config import _T_SOCKNAME as _T_SOCKADDR
-from someip.utils import log_exceptions, wait_cancelled
+from someip.header import _DATACLASS_SLOTS
+from someip.utils import cancel_task, log_exceptions
 
 LOG = logging.getLogger("someip.sd")
 _T_IPADDR = typing.Union[ipaddress.IPv4Address, ipaddress.IPv6Address]
@@ -25,6 +29,30 @@ _T_OPT_SOCKADDR = typing.Optional[_T_SOCKADDR]
 
 TTL_FOREVER = 0xFFFFFF
 
+# upper bound of built SD payloads kept by ServiceDiscoveryProtocol.send_sd
+_SD_PAYLOAD_CACHE_SIZE = 64
+
+# all SOME/IP headers of SD messages are identical except for session id and length
+_SD_HEADER_TEMPLATE = someip.header.SOMEIPHeader(
+    service_id=someip.header.SD_SERVICE,
+    method_id=someip.header.SD_METHOD,
+    client_id=0,
+    session_id=0,
+    interface_version=someip.header.SD_INTERFACE_VERSION,
+    message_type=someip.header.SOMEIPMessageType.NOTIFICATION,
+).build_template()
+
+# entry types bound once, they are compared against for every received entry
+_SD_FIND_SERVICE = someip.header.SOMEIPSDEntryType.FindService
+_SD_OFFER_SERVICE = someip.header.SOMEIPSDEntryType.OfferService
+_SD_SUBSCRIBE = someip.header.SOMEIPSDEntryType.Subscribe
+_SD_SUBSCRIBE_ACK = someip.header.SOMEIPSDEntryType.SubscribeAck
+
+# socket option values for multicast membership and interface selection
+_MREQ_V4 = struct.Struct("=4s4s")
+_MREQ_V6 = struct.Struct("=16sl")
+_IFINDEX = struct.Struct("=i")
+
 
 def ip_address(s: str) -> _T_IPADDR:
     return ipaddress.ip_address(s.split("%", 1)[0])
@@ -38,6 +66,9 @@ def pack_addr_v6(a):
     return socket.inet_pton(socket.AF_INET6, a.split("%", 1)[0])
 
 
+# SD peers are a small, stable set of addresses, while getnameinfo and ipaddress
+# parsing are comparatively expensive. remember formatted addresses
+@functools.lru_cache(maxsize=256)
 def format_address(addr: _T_SOCKADDR) -> str:
     host, port = socket.getnameinfo(addr, socket.NI_NUMERICHOST | socket.NI_NUMERICSERV)
     ip = ipaddress.ip_address(host)
@@ -86,17 +117,18 @@ class SOMEIPDatagramProtocol:
         self.default_addr: _T_OPT_SOCKADDR = None
 
     def datagram_received(self, data, addr: _T_SOCKADDR, multicast: bool) -> None:
+        offset = 0
         try:
-            while data:
+            while offset < len(data):
                 # 4.2.1, TR_SOMEIP_00140 more than one SOMEIP message per UDP frame
                 # allowed
-                parsed, data = someip.header.SOMEIPHeader.parse(data)
+                parsed, offset = someip.header.SOMEIPHeader.parse_from(data, offset)
                 self.message_received(parsed, addr, multicast)
         except someip.header.ParseError as exc:
             self.log.error(
                 "failed to parse SOME/IP datagram from %s: %r",
                 format_address(addr),
-                data,
+                data[offset:],
                 exc_info=exc,
             )
 
@@ -118,10 +150,13 @@ class SOMEIPDatagramProtocol:
         """
         called when a well-formed SOME/IP datagram was received
         """
-        self.log.info("received from %s\n%s", format_address(addr), someip_message)
+        if self.log.isEnabledFor(logging.INFO):
+            self.log.info("received from %s\n%s", format_address(addr), someip_message)
         pass
 
-    def send(self, buf: bytes, remote: _T_OPT_SOCKADDR = None):
+    def send(
+        self, buf: typing.Union[bytes, bytearray], remote: _T_OPT_SOCKADDR = None
+    ):
         # ideally, we'd use transport.write() and have the DGRAM socket connected to the
         # default_addr. However, after connect() the socket will not be bound to
         # INADDR_ANY anymore. so we store the multicast address as a default destination
@@ -155,12 +190,22 @@ class DatagramProtocolAdapter(asyncio.DatagramProtocol):
         self.protocol.connection_lost(exc)
 
 
+# (reboot flag, session id) of the first outgoing message to a remote, and after the
+# session id wrapped around
+_SESSION_INITIAL = (True, 1)
+_SESSION_WRAPPED = (False, 1)
+
+
 class _SessionStorage:
     def __init__(self):
-        self.incoming = {}
-        self.outgoing: typing.DefaultDict[
-            _T_OPT_SOCKADDR, typing.Tuple[bool, int]
-        ] = collections.defaultdict(lambda: (True, 1))
+        # last (reboot flag, session id) per sender, separately for unicast and
+        # multicast, indexed by the multicast flag. avoids building and hashing a
+        # (sender, multicast) key tuple for every received message
+        self.incoming: typing.Tuple[
+            typing.Dict[_T_SOCKADDR, typing.Tuple[bool, int]],
+            typing.Dict[_T_SOCKADDR, typing.Tuple[bool, int]],
+        ] = ({}, {})
+        self.outgoing: typing.Dict[_T_OPT_SOCKADDR, typing.Tuple[bool, int]] = {}
         self.outgoing_lock = threading.Lock()
 
     def check_received(
@@ -169,33 +214,29 @@ class _SessionStorage:
         """
         return true if a reboot was detected
         """
-        k = (sender, multicast)
-
-        try:
-            old_flag, old_session_id = self.incoming[k]
-
-            if flag and (
-                not old_flag or (old_session_id > 0 and old_session_id >= session_id)
-            ):
-                return True
+        incoming = self.incoming[multicast]
+        prev = incoming.get(sender)
+        incoming[sender] = (flag, session_id)
+        if prev is None:
+            # sender not yet known
             return False
-        except KeyError:
-            # sender not yet known -> insert
-            self.incoming[k] = (flag, session_id)
-            return False
-        finally:
-            self.incoming[k] = (flag, session_id)
+
+        old_flag, old_session_id = prev
+        return flag and (
+            not old_flag or (old_session_id > 0 and old_session_id >= session_id)
+        )
 
     def assign_outgoing(self, remote: _T_OPT_SOCKADDR):
         # need a lock for outgoing messages if they may be sent from separate threads
         # eg. when an application logic runs in a seperate thread from the SOMEIP stack
-        # event loop
+        # event loop. the read-modify-write below must stay under the lock, but keep
+        # it to plain dict operations
         with self.outgoing_lock:
-            flag, _id = self.outgoing[remote]
+            flag, _id = self.outgoing.get(remote, _SESSION_INITIAL)
             if _id >= 0xFFFF:
                 # 4.2.1, TR_SOMEIP_00521
                 # 4.2.1, TR_SOMEIP_00255
-                self.outgoing[remote] = (False, 1)
+                self.outgoing[remote] = _SESSION_WRAPPED
             else:
                 self.outgoing[remote] = (flag, _id + 1)
         return flag, _id
@@ -229,6 +270,8 @@ class ServiceDiscoveryProtocol(SOMEIPDatagramProtocol):
         multicast_addr: typing.Optional[str] = None,
         multicast_interface: typing.Optional[str] = None,
         ttl: int = 1,
+        rcvbuf: typing.Optional[int] = None,
+        sndbuf: typing.Optional[int] = None,
     ):
 
         if family not in (socket.AF_INET, socket.AF_INET6):
@@ -314,11 +357,19 @@ class ServiceDiscoveryProtocol(SOMEIPDatagramProtocol):
         sock = trsp.get_extra_info("socket")
 
         try:
+            # a larger receive buffer avoids dropping datagrams during SD bursts, e.g.
+            # when many peers reboot and subscribe at once. the kernel may cap the
+            # value (net.core.rmem_max / wmem_max on Linux)
+            if rcvbuf is not None:
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, rcvbuf)
+            if sndbuf is not None:
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, sndbuf)
+
             if family == socket.AF_INET:
                 packed_local_addr = pack_addr_v4(local_addr)
                 if multicast_addr:
                     packed_mcast_addr = pack_addr_v4(multicast_addr)
-                    mreq = struct.pack("=4s4s", packed_mcast_addr, packed_local_addr)
+                    mreq = _MREQ_V4.pack(packed_mcast_addr, packed_local_addr)
                     sock.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP, mreq)
                 sock.setsockopt(
                     socket.IPPROTO_IP, socket.IP_MULTICAST_IF, packed_local_addr
@@ -331,12 +382,12 @@ class ServiceDiscoveryProtocol(SOMEIPDatagramProtocol):
                 ifindex = socket.if_nametoindex(multicast_interface)
                 if multicast_addr:
                     packed_mcast_addr = pack_addr_v6(multicast_addr)
-                    mreq = struct.pack("=16sl", packed_mcast_addr, ifindex)
+                    mreq = _MREQ_V6.pack(packed_mcast_addr, ifindex)
                     sock.setsockopt(socket.IPPROTO_IPV6, socket.IPV6_JOIN_GROUP, mreq)
                 sock.setsockopt(
                     socket.IPPROTO_IPV6,
                     socket.IPV6_MULTICAST_IF,
-                    struct.pack("=i", ifindex),
+                    _IFINDEX.pack(ifindex),
                 )
                 sock.setsockopt(socket.IPPROTO_IPV6, socket.IPV6_MULTICAST_HOPS, ttl)
         except BaseException:
@@ -355,6 +406,8 @@ class ServiceDiscoveryProtocol(SOMEIPDatagramProtocol):
         port: int = 30490,
         ttl=1,
         loop=None,
+        rcvbuf: typing.Optional[int] = None,
+        sndbuf: typing.Optional[int] = None,
     ):
         if loop is None:  # pragma: nobranch
             loop = asyncio.get_event_loop()
@@ -375,6 +428,8 @@ class ServiceDiscoveryProtocol(SOMEIPDatagramProtocol):
             port,
             multicast_interface=multicast_interface,
             ttl=ttl,
+            rcvbuf=rcvbuf,
+            sndbuf=sndbuf,
         )
 
         trsp_m = await cls._create_endpoint(
@@ -386,6 +441,8 @@ class ServiceDiscoveryProtocol(SOMEIPDatagramProtocol):
             multicast_addr=multicast_addr,
             multicast_interface=multicast_interface,
             ttl=ttl,
+            rcvbuf=rcvbuf,
+            sndbuf=sndbuf,
         )
 
         prot.transport = trsp_u
@@ -405,6 +462,21 @@ class ServiceDiscoveryProtocol(SOMEIPDatagramProtocol):
         self.subscriber = ServiceSubscriber(self)
         self.announcer = ServiceAnnouncer(self)
 
+        self._sd_payloads: typing.Dict[
+            typing.Tuple[typing.Any, ...],
+            typing.Tuple[typing.Tuple[someip.header.SOMEIPSDEntry, ...], bytes],
+        ] = {}
+
+        # dispatch table for sd_message_received, keyed by entry type
+        self._entry_handlers: typing.Dict[
+            someip.header.SOMEIPSDEntryType,
+            typing.Callable[[someip.header.SOMEIPSDEntry, _T_SOCKADDR, bool], None],
+        ] = {
+            _SD_SUBSCRIBE_ACK: self._handle_subscribe_ack_entry,
+            _SD_FIND_SERVICE: self._handle_find_entry,
+            _SD_SUBSCRIBE: self._handle_subscribe_entry,
+        }
+
     def message_received(
         self,
         someip_message: someip.header.SOMEIPHeader,
@@ -452,24 +524,34 @@ class ServiceDiscoveryProtocol(SOMEIPDatagramProtocol):
             return
         flag_reboot, session_id = self.session_storage.assign_outgoing(remote)
 
-        msg = someip.header.SOMEIPSDHeader(
-            flag_reboot=flag_reboot,
-            flag_unicast=True,  # 4.2.1, TR_SOMEIP_00540 receiving unicast is supported
-            entries=tuple(entries),
-        )
-        msg_assigned = msg.assign_option_indexes()
-
-        hdr = someip.header.SOMEIPHeader(
-            service_id=someip.header.SD_SERVICE,
-            method_id=someip.header.SD_METHOD,
-            client_id=0,
-            session_id=session_id,
-            interface_version=1,
-            message_type=someip.header.SOMEIPMessageType.NOTIFICATION,
-            payload=msg_assigned.build(),
+        # entries are immutable and mostly cached by the config objects (e.g. cyclic
+        # offers), so the same SD payload is sent over and over. key the cache by
+        # identity, the cached value keeps the entries (and thus their ids) alive
+        key = (flag_reboot, *map(id, entries))
+        cached = self._sd_payloads.get(key)
+        if cached is None:
+            # only copy on a cache miss: the caller may reuse a list, but the cache
+            # must hold on to exactly these entries
+            if entries.__class__ is not tuple:
+                entries = tuple(entries)
+            msg = someip.header.SOMEIPSDHeader(
+                flag_reboot=flag_reboot,
+                # 4.2.1, TR_SOMEIP_00540 receiving unicast is supported
+                flag_unicast=True,
+                entries=entries,
+            )
+            payload = bytes(msg.assign_option_indexes().build())
+            if len(self._sd_payloads) >= _SD_PAYLOAD_CACHE_SIZE:
+                self._sd_payloads.clear()
+            self._sd_payloads[key] = (entries, payload)
+        else:
+            payload = cached[1]
+
+        buf = someip.header.SOMEIPHeader.build_from_template(
+            _SD_HEADER_TEMPLATE, session_id, payload
         )
 
-        self.send(hdr.build(), remote)
+        self.send(buf, remote)
 
     def start(self) -> None:
         self.subscriber.start()
@@ -484,14 +566,23 @@ class ServiceDiscoveryProtocol(SOMEIPDatagramProtocol):
     def connection_lost(self, exc: typing.Optional[Exception]) -> None:
         log = self.log.exception if exc else self.log.info
         log("connection lost. stopping all child tasks", exc_info=exc)
-        asyncio.get_event_loop().call_soon(self.subscriber.connection_lost, exc)
-        asyncio.get_event_loop().call_soon(self.discovery.connection_lost, exc)
-        asyncio.get_event_loop().call_soon(self.announcer.connection_lost, exc)
+        asyncio.get_event_loop().call_soon(
+            self._notify_children, "connection_lost", exc
+        )
 
     def reboot_detected(self, addr: _T_SOCKADDR) -> None:
-        asyncio.get_event_loop().call_soon(self.subscriber.reboot_detected, addr)
-        asyncio.get_event_loop().call_soon(self.discovery.reboot_detected, addr)
-        asyncio.get_event_loop().call_soon(self.announcer.reboot_detected, addr)
+        asyncio.get_event_loop().call_soon(
+            self._notify_children, "reboot_detected", addr
+        )
+
+    def _notify_children(self, name: str, *args: typing.Any) -> None:
+        # one scheduled callback for all children. exceptions are logged per child, so
+        # one failing child does not keep the others from being notified
+        for child in (self.subscriber, self.discovery, self.announcer):
+            try:
+                getattr(child, name)(*args)
+            except Exception:
+                self.log.exception("unhandled exception in %s.%s", child, name)
 
     def sd_message_received(
         self, sdhdr: someip.header.SOMEIPSDHeader, addr: _T_SOCKADDR, multicast: bool
@@ -499,12 +590,14 @@ class ServiceDiscoveryProtocol(SOMEIPDatagramProtocol):
         """
         called when a well-formed SOME/IP SD message was received
         """
-        LOG.debug(
-            "sd_message_received received from %s (multicast=%r): %s",
-            format_address(addr),
-            multicast,
-            sdhdr,
-        )
+        # format_address is comparatively expensive, only call it when logging
+        if LOG.isEnabledFor(logging.DEBUG):
+            LOG.debug(
+                "sd_message_received received from %s (multicast=%r): %s",
+                format_address(addr),
+                multicast,
+                sdhdr,
+            )
 
         if not sdhdr.flag_unicast:
             # R21-11 PRS_SOMEIPSD_00843 ignoring multicast-only SD messages
@@ -514,40 +607,51 @@ class ServiceDiscoveryProtocol(SOMEIPDatagramProtocol):
             )
             return
 
+        # offers are collected and handed to discovery in a single callback, everything
+        # else is dispatched right away
+        offers = []
+        handlers = self._entry_handlers
         for entry in sdhdr.entries:
-            if entry.sd_type == someip.header.SOMEIPSDEntryType.OfferService:
-                asyncio.get_event_loop().call_soon(
-                    self.discovery.handle_offer, entry, addr
-                )
+            sd_type = entry.sd_type
+            if sd_type is _SD_OFFER_SERVICE:
+                offers.append(entry)
                 continue
+            handler = handlers.get(sd_type)
+            if handler is not None:  # pragma: nobranch
+                handler(entry, addr, multicast)
 
-            if entry.sd_type == someip.header.SOMEIPSDEntryType.SubscribeAck:
-                # TODO raise to application
-                # TODO figure out what to do when not receiving an ACK after X?
-                if entry.ttl == 0:
-                    self.log.info("received Subscribe NACK from %s: %s", addr, entry)
-                else:
-                    self.log.info("received Subscribe ACK from %s: %s", addr, entry)
-                continue
+        if offers:
+            asyncio.get_event_loop().call_soon(
+                self.discovery.handle_offers, offers, addr
+            )
 
-            if entry.sd_type == someip.header.SOMEIPSDEntryType.FindService:
-                self.announcer.handle_findservice(
-                    entry, addr, multicast
-                )
-                continue
+    def _handle_subscribe_ack_entry(
+        self, entry: someip.header.SOMEIPSDEntry, addr: _T_SOCKADDR, multicast: bool
+    ) -> None:
+        # TODO raise to application
+        # TODO figure out what to do when not receiving an ACK after X?
+        if entry.ttl == 0:
+            self.log.info("received Subscribe NACK from %s: %s", addr, entry)
+        else:
+            self.log.info("received Subscribe ACK from %s: %s", addr, entry)
 
-            if (  # pragma: nobranch
-                entry.sd_type == someip.header.SOMEIPSDEntryType.Subscribe
-            ):
-                if multicast:
-                    self.log.warning(
-                        "discarding subscribe received over multicast from %s: %s",
-                        format_address(addr),
-                        entry,
-                    )
-                    continue
-                self.announcer.handle_subscribe(entry, addr)
-                continue
+    def _handle_find_entry(
+        self, entry: someip.header.SOMEIPSDEntry, addr: _T_SOCKADDR, multicast: bool
+    ) -> None:
+        self.announcer.handle_findservice(entry, addr, multicast)
+
+    def _handle_subscribe_entry(
+        self, entry: someip.header.SOMEIPSDEntry, addr: _T_SOCKADDR, multicast: bool
+    ) -> None:
+        if multicast:
+            if self.log.isEnabledFor(logging.WARNING):
+                self.log.warning(
+                    "discarding subscribe received over multicast from %s: %s",
+                    format_address(addr),
+                    entry,
+                )
+            return
+        self.announcer.handle_subscribe(entry, addr)
 
 
 class ServiceSubscriber:
@@ -582,9 +686,16 @@ class ServiceSubscriber:
         # for one iteration when ttl=None
         self.alive = False
 
-        self.subscribeentries: typing.List[
-            typing.Tuple[someip.config.Eventgroup, _T_SOCKADDR],
-        ] = []
+        # subscribed eventgroups per remote SD endpoint. the inner dicts are used as
+        # ordered sets, so subscriptions are sent in the order they were made
+        self.subscribeentries: typing.Dict[
+            _T_SOCKADDR, typing.Dict[someip.config.Eventgroup, None]
+        ] = {}
+
+        # (ttl, eventgroup) per remote, sent together by _flush_pending
+        self._pending: typing.Dict[
+            _T_SOCKADDR, typing.List[typing.Tuple[int, someip.config.Eventgroup]]
+        ] = {}
 
     def subscribe_eventgroup(
         self, eventgroup: someip.config.Eventgroup, endpoint: _T_SOCKADDR
@@ -597,12 +708,10 @@ class ServiceSubscriber:
           remote SD endpoint that will receive the subscription messages
         """
         # relies on _subscribe() to send out the Subscribe messages in the next cycle.
-        self.subscribeentries.append((eventgroup, endpoint))
+        self.subscribeentries.setdefault(endpoint, {})[eventgroup] = None
 
         if self.alive:
-            asyncio.get_event_loop().call_soon(
-                self._send_start_subscribe, endpoint, [eventgroup]
-            )
+            self._queue_send(endpoint, self.timings.SUBSCRIBE_TTL, eventgroup)
 
     def stop_subscribe_eventgroup(
         self,
@@ -616,14 +725,30 @@ class ServiceSubscriber:
         endpoint:
           remote SD endpoint that will receive the subscription messages
         """
-        try:
-            self.subscribeentries.remove((eventgroup, endpoint))
-        except ValueError:
+        eventgroups = self.subscribeentries.get(endpoint)
+        if eventgroups is None or eventgroup not in eventgroups:
             return
+        del eventgroups[eventgroup]
+        if not eventgroups:
+            del self.subscribeentries[endpoint]
 
         if send:
-            asyncio.get_event_loop().call_soon(
-                self._send_stop_subscribe, endpoint, [eventgroup]
+            self._queue_send(endpoint, 0, eventgroup)
+
+    def _queue_send(
+        self, remote: _T_SOCKADDR, ttl: int, eventgroup: someip.config.Eventgroup
+    ) -> None:
+        # (stop) subscribes issued in the same event loop iteration, e.g. by listeners
+        # for all offers of one SD message, are sent as one SD message per remote
+        if not self._pending:
+            asyncio.get_event_loop().call_soon(self._flush_pending)
+        self._pending.setdefault(remote, []).append((ttl, eventgroup))
+
+    def _flush_pending(self) -> None:
+        pending, self._pending = self._pending, {}
+        for remote, entries in pending.items():
+            self.sd.send_sd(
+                [e.create_subscribe_entry(ttl=ttl) for ttl, e in entries], remote=remote
             )
 
     def _send_stop_subscribe(
@@ -662,30 +787,22 @@ class ServiceSubscriber:
         self.alive = False
 
         if self.task:  # pragma: nobranch
-            self.task.cancel()
-            asyncio.create_task(wait_cancelled(self.task))
+            cancel_task(self.task)
             self.task = None
 
         if send_stop_subscribe:
-            for endpoint, entries in self._group_entries().items():
+            for endpoint, entries in self.subscribeentries.items():
+                # copy, the subscriptions may change before the callback runs
                 asyncio.get_event_loop().call_soon(
-                    self._send_stop_subscribe, endpoint, entries
+                    self._send_stop_subscribe, endpoint, list(entries)
                 )
 
-    def _group_entries(
-        self,
-    ) -> typing.Mapping[_T_SOCKADDR, typing.Collection[someip.config.Eventgroup]]:
-        endpoint_entries: typing.DefaultDict[
-            _T_SOCKADDR, typing.List[someip.config.Eventgroup]
-        ] = collections.defaultdict(list)
-        for eventgroup, endpoint in self.subscribeentries:
-            endpoint_entries[endpoint].append(eventgroup)
-        return endpoint_entries
-
     @log_exceptions()
     async def _subscribe(self) -> None:
         while True:
-            for endpoint, entries in self._group_entries().items():
+            # endpoints without subscriptions are removed from subscribeentries, and
+            # sending does not call back into the subscriber, so no copy is needed
+            for endpoint, entries in self.subscribeentries.items():
                 self._send_start_subscribe(endpoint, entries)
 
             if self.timings.SUBSCRIBE_REFRESH_INTERVAL is None:
@@ -705,6 +822,10 @@ class ServiceSubscriber:
 
 
 class ClientServiceListener:
+    # empty slots, so slotted listeners (like AutoSubscribeServiceListener) do not get
+    # a __dict__ through this base
+    __slots__ = ()
+
     def service_offered(
         self, service: someip.config.Service, source: _T_SOCKADDR
     ) -> None:
@@ -716,7 +837,7 @@ class ClientServiceListener:
         ...
 
 
-@dataclasses.dataclass(frozen=True)
+@dataclasses.dataclass(frozen=True, **_DATACLASS_SLOTS)
 class AutoSubscribeServiceListener(ClientServiceListener):
     subscriber: ServiceSubscriber
     eventgroup: someip.config.Eventgroup
@@ -748,13 +869,17 @@ _T_CALLBACK = typing.Callable[[KT, _T_SOCKADDR], None]
 class TimedStore(typing.Generic[KT]):
     def __init__(self, log):
         self.log = log
+        # per address and entry: expiry callback, timeout handle and the deadline. The
+        # handle may be armed for an earlier time than the deadline if the entry was
+        # refreshed since, see _expired
         self.store: typing.Dict[
             _T_SOCKADDR,
             typing.Dict[
                 KT,
                 typing.Tuple[
                     typing.Callable[[KT, _T_SOCKADDR], None],
-                    typing.Optional[asyncio.Handle],
+                    typing.Optional[asyncio.TimerHandle],
+                    float,
                 ],
             ],
         ] = collections.defaultdict(dict)
@@ -767,25 +892,34 @@ class TimedStore(typing.Generic[KT]):
         callback_new: _T_CALLBACK[KT],
         callback_expired: _T_CALLBACK[KT],
     ) -> None:
+        entries = self.store[address]
         try:
-            _, old_timeout_handle = self.store[address].pop(entry)
-            if old_timeout_handle:
-                old_timeout_handle.cancel()
+            _, timeout_handle, _ = entries.pop(entry)
         except KeyError:
             # pop failed => new entry
             callback_new(entry, address)
+            timeout_handle = None
 
-        timeout_handle = None
-        if ttl != TTL_FOREVER:
-            timeout_handle = asyncio.get_event_loop().call_later(
-                ttl, self._expired, address, entry
-            )
+        if ttl == TTL_FOREVER:
+            if timeout_handle:
+                timeout_handle.cancel()
+                timeout_handle = None
+            deadline = 0.0
+        else:
+            loop = asyncio.get_event_loop()
+            deadline = loop.time() + ttl
+            # refreshes usually only push the deadline back. instead of cancelling and
+            # re-creating the handle every time, keep it and let _expired re-arm it
+            if timeout_handle is None or timeout_handle.when() > deadline:
+                if timeout_handle:
+                    timeout_handle.cancel()
+                timeout_handle = loop.call_at(deadline, self._expired, address, entry)
 
-        self.store[address][entry] = (callback_expired, timeout_handle)
+        entries[entry] = (callback_expired, timeout_handle, deadline)
 
     def stop(self, address: _T_SOCKADDR, entry: KT) -> None:
         try:
-            callback, _timeout_handle = self.store[address].pop(entry)
+            callback, _timeout_handle, _ = self.store[address].pop(entry)
         except KeyError:
             # race-condition: service was already stopped. don't notify again
             return
@@ -800,14 +934,25 @@ class TimedStore(typing.Generic[KT]):
         callback(entry, address)
 
     def stop_all_for_address(self, address: _T_SOCKADDR) -> None:
-        for entry, (callback, handle) in self.store[address].items():
+        entries = self.store[address]
+        stopped = list(entries.items())
+        entries.clear()
+        # called immediately for the same reason as in stop(): a reboot is detected
+        # before the offers in the same message are handled, so the stop notifications
+        # must not be deferred past the new offers
+        for entry, (callback, handle, _) in stopped:
             if handle:
                 handle.cancel()
-            asyncio.get_event_loop().call_soon(callback, entry, address)
-        self.store[address].clear()
+            # callbacks end up in user listeners. don't let one of them keep the
+            # remaining entries from being notified
+            try:
+                callback(entry, address)
+            except Exception:
+                self.log.exception("stop callback for %r failed", entry)
 
     def stop_all(self) -> None:
-        for addr in self.store.keys():
+        # callbacks may touch the store for other addresses, iterate over a snapshot
+        for addr in list(self.store):
             self.stop_all_for_address(addr)
         self.store.clear()
 
@@ -823,9 +968,9 @@ class TimedStore(typing.Generic[KT]):
             self.stop(endpoint, entry)
 
     def _expired(self, address: _T_SOCKADDR, entry: KT) -> None:
-        try:
-            callback, _ = self.store[address].pop(entry)
-        except KeyError:  # pragma: nocover
+        entries = self.store[address]
+        value = entries.get(entry)
+        if value is None:  # pragma: nocover
             self.log.warning(
                 "race-condition: entry %r timeout was not in store but triggered"
                 " anyway. forgot to cancel?",
@@ -833,7 +978,19 @@ class TimedStore(typing.Generic[KT]):
             )
             return
 
-        asyncio.get_event_loop().call_soon(callback, entry, address)
+        callback, handle, deadline = value
+        loop = asyncio.get_event_loop()
+        if handle is not None and deadline > handle.when():
+            # refreshed since the handle was armed: not expired yet
+            entries[entry] = (
+                callback,
+                loop.call_at(deadline, self._expired, address, entry),
+                deadline,
+            )
+            return
+
+        del entries[entry]
+        callback(entry, address)
 
     def entries(self) -> typing.Iterator[KT]:
         return itertools.chain.from_iterable(x.keys() for x in self.store.values())
@@ -849,6 +1006,11 @@ class ServiceDiscover:
             someip.config.Service,
             typing.Set[ClientServiceListener],
         ] = collections.defaultdict(set)
+        # keys of watched_services by service id, so offers only need to be matched
+        # against filters for the same service
+        self._watched_by_id: typing.DefaultDict[
+            int, typing.List[someip.config.Service]
+        ] = collections.defaultdict(list)
         self.watcher_all_services: typing.Set[ClientServiceListener] = set()
 
         self.found_services: TimedStore[someip.config.Service] = TimedStore(self.log)
@@ -863,10 +1025,20 @@ class ServiceDiscover:
 
     def stop(self):
         if self.task:  # pragma: nobranch
-            self.task.cancel()
-            asyncio.create_task(wait_cancelled(self.task))
+            cancel_task(self.task)
             self.task = None
 
+    def handle_offers(
+        self, entries: typing.Iterable[someip.header.SOMEIPSDEntry], addr: _T_SOCKADDR
+    ) -> None:
+        # one callback handles all offers of a message. a failing listener must not
+        # keep the remaining offers from being handled
+        for entry in entries:
+            try:
+                self.handle_offer(entry, addr)
+            except Exception:
+                self.log.exception("handling offer %s failed", entry)
+
     def handle_offer(
         self, entry: someip.header.SOMEIPSDEntry, addr: _T_SOCKADDR
     ) -> None:
@@ -880,47 +1052,63 @@ class ServiceDiscover:
     def is_watching_service(self, entry: someip.header.SOMEIPSDEntry):
         if self.watcher_all_services:
             return True
-        return any(s.matches_offer(entry) for s in self.watched_services.keys())
+        filters = self._watched_by_id.get(entry.service_id, ())
+        return any(s.matches_offer(entry) for s in filters)
 
     def watch_service(
         self, service: someip.config.Service, listener: ClientServiceListener
     ) -> None:
-        self.watched_services[service].add(listener)
-
-        for addr, services in self.found_services.store.items():
-            for s in services:
+        listeners = self.watched_services.get(service)
+        if listeners is None:
+            self.watched_services[service] = listeners = set()
+            self._watched_by_id[service.service_id].append(service)
+        listeners.add(listener)
+
+        for addr, services in list(self.found_services.store.items()):
+            for s in list(services):
                 if service.matches_service(s):
-                    asyncio.get_event_loop().call_soon(
-                        listener.service_offered, s, addr
-                    )
+                    self._call_listener(listener.service_offered, s, addr)
 
     def stop_watch_service(
         self, service: someip.config.Service, listener: ClientServiceListener
     ) -> None:
         self.watched_services[service].remove(listener)
 
-        # TODO verify if this makes sense
-        for addr, services in self.found_services.store.items():
-            for s in services:
+        # every found service matching the filter was announced to this listener,
+        # either by watch_service or later by _notify_service_offered. tell it that
+        # they are gone so it can release them (e.g. unsubscribe eventgroups)
+        for addr, services in list(self.found_services.store.items()):
+            for s in list(services):
                 if service.matches_service(s):
-                    asyncio.get_event_loop().call_soon(
-                        listener.service_stopped, s, addr
-                    )
+                    self._call_listener(listener.service_stopped, s, addr)
 
     def watch_all_services(self, listener: ClientServiceListener) -> None:
         self.watcher_all_services.add(listener)
 
-        for addr, services in self.found_services.store.items():
-            for s in services:
-                asyncio.get_event_loop().call_soon(listener.service_offered, s, addr)
+        for addr, services in list(self.found_services.store.items()):
+            for s in list(services):
+                self._call_listener(listener.service_offered, s, addr)
 
     def stop_watch_all_services(self, listener: ClientServiceListener) -> None:
         self.watcher_all_services.remove(listener)
 
-        # TODO verify if this makes sense
-        for addr, services in self.found_services.store.items():
-            for s in services:
-                asyncio.get_event_loop().call_soon(listener.service_stopped, s, addr)
+        # see stop_watch_service
+        for addr, services in list(self.found_services.store.items()):
+            for s in list(services):
+                self._call_listener(listener.service_stopped, s, addr)
+
+    def _call_listener(
+        self,
+        callback: typing.Callable[[someip.config.Service, _T_SOCKADDR], None],
+        service: someip.config.Service,
+        addr: _T_SOCKADDR,
+    ) -> None:
+        # listeners are called synchronously from the (stop_)watch_* methods. their
+        # exceptions must neither reach the caller nor skip the remaining services
+        try:
+            callback(service, addr)
+        except Exception:
+            self.log.exception("unhandled exception in %s", callback)
 
     def find_subscribe_eventgroup(self, eventgroup: someip.config.Eventgroup):
         self.watch_service(
@@ -934,18 +1122,30 @@ class ServiceDiscover:
             AutoSubscribeServiceListener(self.sd.subscriber, eventgroup),
         )
 
-    def _service_found(self, service: someip.config.Service) -> bool:
-        return any(service.matches_service(s) for s in self.found_services.entries())
+    def _found_by_id(self) -> typing.Dict[int, typing.List[someip.config.Service]]:
+        found: typing.Dict[int, typing.List[someip.config.Service]] = {}
+        for service in self.found_services.entries():
+            found.setdefault(service.service_id, []).append(service)
+        return found
 
     async def send_find_services(self):
         if not self.watched_services:
             return
 
         def _build_entries():
+            # group the found services once, instead of scanning all of them for every
+            # watched service. find entries are cached by the services, so repetitions
+            # with the same set of unfound services reuse the same entries and payload
+            found = self._found_by_id()
+            ttl = self.timings.FIND_TTL
             return [
-                service.create_find_entry(self.timings.FIND_TTL)
+                service.create_find_entry(ttl)
                 for service in self.watched_services.keys()
-                if not self._service_found(service)  # 4.2.1: SWS_SD_00365
+                # 4.2.1: SWS_SD_00365
+                if not any(
+                    service.matches_service(s)
+                    for s in found.get(service.service_id, ())
+                )
             ]
 
         await asyncio.sleep(
@@ -998,9 +1198,9 @@ class ServiceDiscover:
     def _notify_service_offered(
         self, service: someip.config.Service, source: _T_SOCKADDR
     ) -> None:
-        for service_filter, listeners in self.watched_services.items():
+        for service_filter in self._watched_by_id.get(service.service_id, ()):
             if service_filter.matches_service(service):
-                for listener in listeners:
+                for listener in self.watched_services[service_filter]:
                     listener.service_offered(service, source)
         for listener in self.watcher_all_services:
             listener.service_offered(service, source)
@@ -1008,15 +1208,15 @@ class ServiceDiscover:
     def _notify_service_stopped(
         self, service: someip.config.Service, source: _T_SOCKADDR
     ) -> None:
-        for service_filter, listeners in self.watched_services.items():
+        for service_filter in self._watched_by_id.get(service.service_id, ()):
             if service_filter.matches_service(service):
-                for listener in listeners:
+                for listener in self.watched_services[service_filter]:
                     listener.service_stopped(service, source)
         for listener in self.watcher_all_services:
             listener.service_stopped(service, source)
 
 
-@dataclasses.dataclass(frozen=True)
+@dataclasses.dataclass(frozen=True, **_DATACLASS_SLOTS)
 class EventgroupSubscription:
     service_id: int
     instance_id: int
@@ -1054,7 +1254,7 @@ class EventgroupSubscription:
 
     def to_ack_entry(self):
         return someip.header.SOMEIPSDEntry(
-            sd_type=someip.header.SOMEIPSDEntryType.SubscribeAck,
+            sd_type=_SD_SUBSCRIBE_ACK,
             service_id=self.service_id,
             instance_id=self.instance_id,
             major_version=self.major_version,
@@ -1071,6 +1271,8 @@ class NakSubscription(Exception):  # noqa: N818
 
 
 class ServerServiceListener:
+    __slots__ = ()
+
     def client_subscribed(
         self, subscription: EventgroupSubscription, source: _T_SOCKADDR
     ) -> None:
@@ -1123,8 +1325,7 @@ class ServiceInstance:
         if self._task is None:  # pragma: nocover
             raise RuntimeError("task already stopped")
 
-        self._task.cancel()
-        asyncio.create_task(wait_cancelled(self._task))
+        cancel_task(self._task)
         self._task = None
 
         # cyclic tasks send stop when they are cancelled
@@ -1184,11 +1385,12 @@ class ServiceInstance:
     ) -> bool:
         if not self._can_answer_offers:
             # 4.2.1 SWS_SD_00319
-            self.log.info(
-                "ignoring FindService from %s during Initial Wait Phase: %s",
-                format_address(addr),
-                entry,
-            )
+            if self.log.isEnabledFor(logging.INFO):
+                self.log.info(
+                    "ignoring FindService from %s during Initial Wait Phase: %s",
+                    format_address(addr),
+                    entry,
+                )
             return False
 
         return self.service.matches_find(entry)
@@ -1237,6 +1439,12 @@ VT = typing.TypeVar("VT")
 
 
 class SendCollector(typing.Generic[KT]):
+    """
+    .. deprecated::
+        no longer used by :class:`ServiceAnnouncer`, which now collects entries for
+        all remotes under a single timer. Will be removed in a future release.
+    """
+
     def __init__(
         self,
         timeout: float,
@@ -1244,6 +1452,11 @@ class SendCollector(typing.Generic[KT]):
         *args,
         **kwargs,
     ):
+        warnings.warn(
+            "SendCollector is deprecated and no longer used by ServiceAnnouncer",
+            DeprecationWarning,
+            stacklevel=2,
+        )
         self.data: typing.List[VT] = []
         self.args = args
         self.kwargs = kwargs
@@ -1276,10 +1489,19 @@ class ServiceAnnouncer:
         self.log = sd.log.getChild("announce")
 
         self.started = False
-        self.announcing_services: typing.List[ServiceInstance] = []
-        self.send_queues: typing.Dict[
-            _T_OPT_SOCKADDR, SendCollector[someip.header.SOMEIPSDEntry]
+        self._announcing_services: typing.List[ServiceInstance] = []
+        # _announcing_services indexed by service id and instance id, so incoming SD
+        # entries only need to be matched against instances that could possibly match.
+        # instances configured with the 0xFFFF wildcard instance id are kept under it
+        self._services_by_id: typing.Dict[
+            int, typing.Dict[int, typing.List[ServiceInstance]]
         ] = {}
+        # entries queued by queue_send, grouped by remote. all remotes are flushed by
+        # a single timer
+        self._send_queues: typing.Dict[
+            _T_OPT_SOCKADDR, typing.List[someip.header.SOMEIPSDEntry]
+        ] = {}
+        self._send_handle: typing.Optional[asyncio.TimerHandle] = None
 
     def queue_send(
         self, entry: someip.header.SOMEIPSDEntry, remote: _T_OPT_SOCKADDR = None
@@ -1288,20 +1510,58 @@ class ServiceAnnouncer:
             self.sd.send_sd([entry], remote=remote)
             return
 
-        queue = self.send_queues.get(remote)
-        if queue is None or queue.done:
-            self.send_queues[remote] = queue = SendCollector(
-                self.timings.SEND_COLLECTION_TIMEOUT, self.sd.send_sd, remote=remote
-            )
-
         # FIXME stops and starts for the same instance in the same queue make no sense
         # and should probably be cleaned out
-        queue.append(entry)
+        queue = self._send_queues.get(remote)
+        if queue is None:
+            self._send_queues[remote] = [entry]
+        else:
+            queue.append(entry)
+
+        if self._send_handle is None:
+            self._send_handle = asyncio.get_event_loop().call_later(
+                self.timings.SEND_COLLECTION_TIMEOUT, self._flush_send_queues
+            )
+
+    @property
+    def send_queues(
+        self,
+    ) -> typing.Mapping[_T_OPT_SOCKADDR, typing.List[someip.header.SOMEIPSDEntry]]:
+        """
+        .. deprecated::
+            read-only view of the entries queued per remote. The values used to be
+            :class:`SendCollector` instances and are now plain lists of entries. Will
+            be removed in a future release.
+        """
+        warnings.warn(
+            "ServiceAnnouncer.send_queues is deprecated",
+            DeprecationWarning,
+            stacklevel=2,
+        )
+        return types.MappingProxyType(self._send_queues)
+
+    def _flush_send_queues(self) -> None:
+        self._send_handle = None
+        queues, self._send_queues = self._send_queues, {}
+        for remote, entries in queues.items():
+            self.sd.send_sd(entries, remote=remote)
+
+    @property
+    def announcing_services(self) -> typing.Sequence[ServiceInstance]:
+        """
+        read-only snapshot of the announced instances. Use :meth:`announce_service`
+        and :meth:`stop_announce_service` to change it.
+        """
+        return tuple(self._announcing_services)
 
     def announce_service(self, instance: ServiceInstance) -> None:
         if self.started:
             instance.start()
-        self.announcing_services.append(instance)
+        self._announcing_services.append(instance)
+        service = instance.service
+        self._services_by_id.setdefault(service.service_id, {}).setdefault(
+            service.instance_id, []
+        ).append(instance)
 
     def stop_announce_service(self, instance: ServiceInstance, send_stop=True) -> None:
         """
@@ -1310,10 +1570,36 @@ class ServiceAnnouncer:
         :param instance: service instance to be stopped
         :raises ValueError: if the service was not announcing
         """
-        self.announcing_services.remove(instance)
+        self._announcing_services.remove(instance)
+        service = instance.service
+        by_instance = self._services_by_id[service.service_id]
+        instances = by_instance[service.instance_id]
+        instances.remove(instance)
+        if not instances:
+            del by_instance[service.instance_id]
+            if not by_instance:
+                del self._services_by_id[service.service_id]
         if send_stop and self.started:
             instance.stop()
 
+    def _candidates(
+        self, entry: someip.header.SOMEIPSDEntry
+    ) -> typing.Iterable[ServiceInstance]:
+        """
+        returns the announced instances that might match the given entry. The caller
+        still has to apply the exact match (versions, eventgroups, ...)
+        """
+        by_instance = self._services_by_id.get(entry.service_id)
+        if not by_instance:
+            return ()
+        if entry.instance_id == 0xFFFF:
+            return itertools.chain.from_iterable(by_instance.values())
+        exact = by_instance.get(entry.instance_id, [])
+        wildcard = by_instance.get(0xFFFF)
+        if wildcard is None:
+            return exact
+        return exact + wildcard
+
     def handle_subscribe(
         self,
         entry: someip.header.SOMEIPSDEntry,
@@ -1322,21 +1608,24 @@ class ServiceAnnouncer:
 
         matching_services = []
 
-        for instance in self.announcing_services:
+        for instance in self._candidates(entry):
             if instance.handle_subscribe(entry, addr):
                 matching_services.append(instance)
 
         if not matching_services:
-            self.log.warning(
-                "discarding subscribe for unknown service from %s: %s",
-                format_address(addr),
-                entry,
-            )
+            # may be hit for every entry of a misbehaving peer, skip formatting the
+            # address if the warning is filtered anyway
+            if self.log.isEnabledFor(logging.WARNING):
+                self.log.warning(
+                    "discarding subscribe for unknown service from %s: %s",
+                    format_address(addr),
+                    entry,
+                )
             subscription = EventgroupSubscription.from_subscribe_entry(entry)
             self._send_subscribe_nack(subscription, addr)
             return
 
-        if len(matching_services) > 1:
+        if len(matching_services) > 1 and self.log.isEnabledFor(logging.WARNING):
             self.log.warning(
                 "multiple configured services matched subscribe %s from %s: %s",
                 entry,
@@ -1355,11 +1644,12 @@ class ServiceAnnouncer:
         addr: _T_SOCKADDR,
         received_over_multicast: bool,
     ) -> None:
-        self.log.info("received from %s: %s", format_address(addr), entry)
+        if self.log.isEnabledFor(logging.INFO):
+            self.log.info("received from %s: %s", format_address(addr), entry)
 
         matching_instances = []
 
-        for instance in self.announcing_services:
+        for instance in self._candidates(entry):
             if instance.matches_find(entry, addr):
                 matching_instances.append(instance)
 
@@ -1369,6 +1659,7 @@ class ServiceAnnouncer:
         # R21-11 PRS_SOMEIPSD_00423 not implemented because it's unclear how it should
         # behave for multiple services with different offer periods
 
+        loop = asyncio.get_event_loop()
         # R21-11 PRS_SOMEIPSD_00417 and PRS_SOMEIPSD_00419
         if received_over_multicast:
             # R21-11 PRS_SOMEIPSD_00420 and PRS_SOMEIPSD_00421
@@ -1376,25 +1667,21 @@ class ServiceAnnouncer:
                 self.timings.REQUEST_RESPONSE_DELAY_MIN,
                 self.timings.REQUEST_RESPONSE_DELAY_MAX,
             )
-
-            def call(func) -> None:
-                asyncio.get_event_loop().call_later(delay, func, addr)
-
+            # same deadline for all matching instances, only read the clock once
+            when = loop.time() + delay
+            for instance in matching_instances:
+                loop.call_at(when, instance._send_offer, addr)
         else:
-
-            def call(func) -> None:
-                asyncio.get_event_loop().call_soon(func, addr)
-
-        for instance in matching_instances:
-            call(instance._send_offer)
+            for instance in matching_instances:
+                loop.call_soon(instance._send_offer, addr)
 
     def start(self, loop=None):
-        for instance in self.announcing_services:
+        for instance in self._announcing_services:
             instance.start()
         self.started = True
 
     def stop(self):
-        for instance in self.announcing_services:
+        for instance in self._announcing_services:
             instance.stop()
         self.started = False
 
@@ -1402,5 +1689,5 @@ class ServiceAnnouncer:
         self.stop()
 
     def reboot_detected(self, addr: _T_SOCKADDR) -> None:
-        for instance in self.announcing_services:
+        for instance in self._announcing_services:
             instance.reboot_detected(addr)
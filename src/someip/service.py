@@ -8,9 +8,7 @@ from __future__ import annotations
 
 import asyncio
 import collections
-import dataclasses
 import functools
-import warnings
 import typing
 
 from someip import header, config, sd, utils
@@ -21,6 +19,36 @@ _T_METHOD_HANDLER = typing.Callable[
 ]
 
 
+# error responses are built from header templates keyed by the fields copied from the
+# request. those are chosen by remote peers, so bound the cache
+_ERROR_TEMPLATE_CACHE_SIZE = 64
+
+
+def _build_response(
+    msg: header.SOMEIPHeader,
+    message_type: header.SOMEIPMessageType,
+    return_code: header.SOMEIPReturnCode,
+    payload: bytes,
+) -> bytearray:
+    # like dataclasses.replace(msg, ...).build(), without copying the request
+    buf = bytearray(header._SOMEIP_HEADER_SIZE + len(payload))
+    header._SOMEIP_HEADER_PACK_INTO(
+        buf,
+        0,
+        msg.service_id,
+        msg.method_id,
+        len(payload) + 8,
+        msg.client_id,
+        msg.session_id,
+        msg.protocol_version,
+        msg.interface_version,
+        message_type,
+        return_code,
+    )
+    buf[header._SOMEIP_HEADER_SIZE :] = payload
+    return buf
+
+
 class MalformedMessageError(Exception):
     pass
 
@@ -36,6 +64,17 @@ class SimpleEventgroup:
     New subscribers will be notified about the current :attr:`values`.
     """
 
+    __slots__ = (
+        "id",
+        "service",
+        "log",
+        "subscribed_endpoints",
+        "notification_task",
+        "has_clients",
+        "values",
+        "_templates",
+    )
+
     def __init__(
         self, service: SimpleService, id: int, interval: typing.Optional[float] = None
     ):
@@ -60,6 +99,24 @@ class SimpleEventgroup:
         the current value for each event to send out as notification payload.
         """
 
+        # notification headers only differ in session id and length, see
+        # SOMEIPHeader.build_template
+        self._templates: typing.Dict[int, bytes] = {}
+
+    def _template(self, event_id: int) -> bytes:
+        template = self._templates.get(event_id)
+        if template is None:
+            template = header.SOMEIPHeader(
+                service_id=self.service.service_id,
+                method_id=0x8000 | event_id,
+                client_id=0,
+                session_id=0,
+                message_type=header.SOMEIPMessageType.NOTIFICATION,
+                interface_version=self.service.version_major,
+            ).build_template()
+            self._templates[event_id] = template
+        return template
+
     @utils.log_exceptions()
     async def _notify_single(
         self,
@@ -67,8 +124,11 @@ class SimpleEventgroup:
         events: typing.Iterable[int],
         label: str,
     ) -> None:
-        addr = await endpoint.addrinfo()
+        self._send_notifications(await endpoint.addrinfo(), events, label)
 
+    def _send_notifications(
+        self, addr: header._T_SOCKNAME, events: typing.Iterable[int], label: str
+    ) -> None:
         msgbuf = bytearray()
         for event_id in events:
             payload = self.values[event_id]
@@ -76,29 +136,22 @@ class SimpleEventgroup:
             self.log.info("%s notify 0x%04x to %r: %r", label, event_id, addr, payload)
 
             _, session_id = self.service.session_storage.assign_outgoing(addr)
-            hdr = header.SOMEIPHeader(
-                service_id=self.service.service_id,
-                method_id=0x8000 | event_id,
-                client_id=0,
-                session_id=session_id,
-                message_type=header.SOMEIPMessageType.NOTIFICATION,
-                interface_version=self.service.version_major,
-                payload=payload,
+            header.SOMEIPHeader.build_from_template(
+                self._template(event_id), session_id, payload, msgbuf
             )
 
-            msgbuf += hdr.build()
-
         if msgbuf:
             self.service.send(msgbuf, addr)
 
     @utils.log_exceptions()
     async def _notify_all(self, events: typing.Iterable[int], label: str):
-        await asyncio.gather(
-            *[
-                self._notify_single(ep, events=events, label=label)
-                for ep in self.subscribed_endpoints
-            ]
-        )
+        # endpoint addresses are numeric, addrinfo() does not actually suspend. so
+        # instead of one task per subscriber, notify them one after another
+        for endpoint in tuple(self.subscribed_endpoints):
+            try:
+                self._send_notifications(await endpoint.addrinfo(), events, label)
+            except Exception:
+                self.log.exception("%s notify to %r failed", label, endpoint)
 
     def notify_once(self, events: typing.Iterable[int]):
         """
@@ -118,14 +171,21 @@ class SimpleEventgroup:
 
         :param interval: how much time to wait before sending the next notification
         """
+        loop = asyncio.get_running_loop()
         while True:
             await self.has_clients.wait()
 
             # client subscription already sent first notification.
             # wait for one interval *before* sending next
-            await asyncio.sleep(interval)
+            deadline = loop.time() + interval
+            while self.has_clients.is_set():
+                await asyncio.sleep(deadline - loop.time())
+
+                await self._notify_all(events=self.values.keys(), label="cyclic")
 
-            await self._notify_all(events=self.values.keys(), label="cyclic")
+                # keep the cadence independent of how long sending took, but don't
+                # try to catch up on missed ticks after a stall
+                deadline = max(deadline + interval, loop.time())
 
     def subscribe(self, endpoint: header.EndpointOption[typing.Any]) -> None:
         """
@@ -167,7 +227,30 @@ class SimpleService(sd.SOMEIPDatagramProtocol, sd.ServerServiceListener):
         ] = collections.defaultdict(set)
         self.eventgroups: typing.Dict[int, SimpleEventgroup] = {}
         self.methods: typing.Dict[int, _T_METHOD_HANDLER] = {}
+        # (service id, interface version, message type, return code) of valid
+        # requests, checked with one lookup in message_received. handlers are always
+        # looked up in methods, so changes to it take effect immediately
+        self._valid_requests: typing.FrozenSet[typing.Tuple[int, int, int, int]] = (
+            frozenset(
+                (
+                    self.service_id,
+                    self.version_major,
+                    message_type,
+                    header.SOMEIPReturnCode.E_OK,
+                )
+                for message_type in (
+                    header.SOMEIPMessageType.REQUEST,
+                    header.SOMEIPMessageType.REQUEST_NO_RETURN,
+                )
+            )
+        )
+        self._error_templates: typing.Dict[
+            typing.Tuple[int, int, int, int, header.SOMEIPReturnCode], bytes
+        ] = {}
         self.instance_id: int = instance_id
+        # built by as_config, reset by register_eventgroup
+        self._config: typing.Optional[config.Service] = None
+        self._multicast_dropped = 0
         self.log = self.log.getChild(f"service-{self.service_id:04x}-{instance_id:04x}")
 
     def register_method(self, id: int, handler: _T_METHOD_HANDLER) -> None:
@@ -198,21 +281,31 @@ class SimpleService(sd.SOMEIPDatagramProtocol, sd.ServerServiceListener):
                 f"eventgroup with id {eventgroup.id:#x} already registered on {self}"
             )
         self.eventgroups[eventgroup.id] = eventgroup
+        self._config = None
 
     @functools.cached_property
     def _endpoint(self) -> header.SOMEIPSDOption:
         sockname = self.transport.get_extra_info("sockname")
         return config.Eventgroup._sockaddr_to_endpoint(sockname, header.L4Protocols.UDP)
 
-    def as_config(self):
-        return config.Service(
-            self.service_id,
-            self.instance_id,
-            self.version_major,
-            self.version_minor,
-            options_1=(self._endpoint,),
-            eventgroups=frozenset(self.eventgroups.keys()),
-        )
+    @property
+    def multicast_dropped(self) -> int:
+        """
+        number of packets that were dropped because they were received over multicast
+        """
+        return self._multicast_dropped
+
+    def as_config(self) -> config.Service:
+        if self._config is None:
+            self._config = config.Service(
+                self.service_id,
+                self.instance_id,
+                self.version_major,
+                self.version_minor,
+                options_1=(self._endpoint,),
+                eventgroups=frozenset(self.eventgroups.keys()),
+            )
+        return self._config
 
     @classmethod
     async def start_datagram_endpoint(
@@ -254,12 +347,52 @@ class SimpleService(sd.SOMEIPDatagramProtocol, sd.ServerServiceListener):
         multicast: bool,
     ) -> None:
         if multicast:
-            warnings.warn(
-                "Service packet received over multicast - this does not make sense."
-                " You probably created the wrong type of socket for this service.",
-                stacklevel=2,
+            # only complain once, a misconfigured socket may see a lot of these
+            if not self._multicast_dropped:
+                self.log.warning(
+                    "Service packet received over multicast - this does not make sense."
+                    " You probably created the wrong type of socket for this service."
+                    " Suppressing further warnings."
+                )
+            self._multicast_dropped += 1
+            return
+        method = None
+        if (
+            someip_message.service_id,
+            someip_message.interface_version,
+            someip_message.message_type,
+            someip_message.return_code,
+        ) in self._valid_requests:
+            method = self.methods.get(someip_message.method_id)
+        if method is None:
+            self._reject_request(someip_message, addr)
+            return
+
+        self.log.info(
+            "%r calling %s: %r",
+            addr,
+            method,
+            someip_message.payload,
+        )
+        try:
+            response = method(someip_message, addr)
+        except MalformedMessageError:
+            self.send_error_response(
+                someip_message, addr, header.SOMEIPReturnCode.E_MALFORMED_MESSAGE
             )
             return
+
+        if (
+            response is not None
+            and someip_message.message_type == header.SOMEIPMessageType.REQUEST
+        ):
+            self.send_positive_response(someip_message, addr, payload=response)
+
+    def _reject_request(
+        self, someip_message: header.SOMEIPHeader, addr: header._T_SOCKNAME
+    ) -> None:
+        # slow path of message_received for invalid requests: find out what is wrong
+        # and send the matching error response
         if someip_message.service_id != self.service_id:
             self.log.warning("received message for unknown service: %r", someip_message)
             self.send_error_response(
@@ -275,8 +408,7 @@ class SimpleService(sd.SOMEIPDatagramProtocol, sd.ServerServiceListener):
             )
             return
 
-        method = self.methods.get(someip_message.method_id)
-        if method is None:
+        if someip_message.method_id not in self.methods:
             self.log.warning(
                 "received message for unknown method id: %r", someip_message
             )
@@ -297,34 +429,11 @@ class SimpleService(sd.SOMEIPDatagramProtocol, sd.ServerServiceListener):
             )
             return
 
-        if someip_message.return_code != header.SOMEIPReturnCode.E_OK:
-            self.log.warning(
-                "received message with bad return code: %r", someip_message
-            )
-            self.send_error_response(
-                someip_message, addr, header.SOMEIPReturnCode.E_WRONG_MESSAGE_TYPE
-            )
-            return
-
-        self.log.info(
-            "%r calling %s: %r",
-            addr,
-            method,
-            someip_message.payload,
+        # everything else is valid, so the return code is wrong
+        self.log.warning("received message with bad return code: %r", someip_message)
+        self.send_error_response(
+            someip_message, addr, header.SOMEIPReturnCode.E_WRONG_MESSAGE_TYPE
         )
-        try:
-            response = method(someip_message, addr)
-        except MalformedMessageError:
-            self.send_error_response(
-                someip_message, addr, header.SOMEIPReturnCode.E_MALFORMED_MESSAGE
-            )
-            return
-
-        if (
-            response is not None
-            and someip_message.message_type == header.SOMEIPMessageType.REQUEST
-        ):
-            self.send_positive_response(someip_message, addr, payload=response)
 
     def send_error_response(
         self,
@@ -332,13 +441,28 @@ class SimpleService(sd.SOMEIPDatagramProtocol, sd.ServerServiceListener):
         addr: header._T_SOCKNAME,
         return_code: header.SOMEIPReturnCode,
     ) -> None:
-        resp = dataclasses.replace(
-            msg,
-            message_type=header.SOMEIPMessageType.ERROR,
-            return_code=return_code,
-            payload=b"",
+        # only client and session id differ between error responses to the same
+        # method, so patch those into a cached header instead of building a new one
+        key = (
+            msg.service_id,
+            msg.method_id,
+            msg.protocol_version,
+            msg.interface_version,
+            return_code,
         )
-        self.send(resp.build(), addr)
+        template = self._error_templates.get(key)
+        if template is None:
+            # client and session id are overwritten for every response
+            template = bytes(
+                _build_response(msg, header.SOMEIPMessageType.ERROR, return_code, b"")
+            )
+            if len(self._error_templates) >= _ERROR_TEMPLATE_CACHE_SIZE:
+                self._error_templates.clear()
+            self._error_templates[key] = template
+
+        buf = bytearray(template)
+        header._SOMEIP_REQUEST_ID_PACK_INTO(buf, 8, msg.client_id, msg.session_id)
+        self.send(buf, addr)
 
     def send_positive_response(
         self,
@@ -346,31 +470,35 @@ class SimpleService(sd.SOMEIPDatagramProtocol, sd.ServerServiceListener):
         addr: header._T_SOCKNAME,
         payload: bytes = b"",
     ) -> None:
-        resp = dataclasses.replace(
-            msg, message_type=header.SOMEIPMessageType.RESPONSE, payload=payload
+        buf = _build_response(
+            msg, header.SOMEIPMessageType.RESPONSE, msg.return_code, payload
         )
-        self.send(resp.build(), addr)
+        self.send(buf, addr)
 
     def client_subscribed(
         self,
         subscription: sd.EventgroupSubscription,
         source: header._T_SOCKNAME,
     ) -> None:
-        try:
-            evgrp = self.eventgroups.get(subscription.id)
-            assert (
-                evgrp
-            ), f"{self}.client_subscribed called with unknown subscription id"
-            if len(subscription.endpoints) != 1:
-                self.log.error(
-                    "client tried to subscribe with multiple endpoints from %r:\n%s",
-                    source,
-                    subscription,
-                )
-                raise sd.NakSubscription
-            self.log.info("client_subscribed from %r: %s", source, subscription)
+        evgrp = self.eventgroups.get(subscription.id)
+        if evgrp is None:
+            self.log.error(
+                "client_subscribed from %r with unknown eventgroup: %s",
+                source,
+                subscription,
+            )
+            raise sd.NakSubscription
+        if len(subscription.endpoints) != 1:
+            self.log.error(
+                "client tried to subscribe with multiple endpoints from %r:\n%s",
+                source,
+                subscription,
+            )
+            raise sd.NakSubscription
+        self.log.info("client_subscribed from %r: %s", source, subscription)
 
-            ep = next(iter(subscription.endpoints))
+        ep = next(iter(subscription.endpoints))
+        try:
             evgrp.subscribe(ep)
         except Exception as exc:
             self.log.exception(
@@ -381,15 +509,12 @@ class SimpleService(sd.SOMEIPDatagramProtocol, sd.ServerServiceListener):
     def client_unsubscribed(
         self, subscription: sd.EventgroupSubscription, source: header._T_SOCKNAME
     ) -> None:
-        try:
-            evgrp = self.eventgroups.get(subscription.id)
-            assert (
-                evgrp
-            ), f"{self}.client_unsubscribed called with unknown subscription id"
-            ep = next(iter(subscription.endpoints))
-            evgrp.unsubscribe(ep)
-            self.log.info("client_unsubscribed from %r: %s", source, subscription)
-        except KeyError:
+        evgrp = self.eventgroups.get(subscription.id)
+        ep = next(iter(subscription.endpoints), None)
+        if evgrp is None or ep not in evgrp.subscribed_endpoints:
             self.log.warning(
                 "client_unsubscribed unknown from %r: %s", source, subscription
             )
+            return
+        evgrp.unsubscribe(ep)
+        self.log.info("client_unsubscribed from %r: %s", source, subscription)
@@ -94,3 +94,18 @@ async def wait_cancelled(task: asyncio.Task[T]) -> typing.Optional[T]:
     if task.cancelled():
         return None
     return task.result()
+
+
+# tasks cancelled by cancel_task that did not finish yet. The event loop only keeps
+# weak references to tasks, so hold on to them until they are done
+_cancelling_tasks: typing.Set[asyncio.Task[typing.Any]] = set()
+
+
+def cancel_task(task: asyncio.Task[typing.Any]) -> None:
+    """
+    cancel `task` without waiting for it to finish. Unlike scheduling
+    :func:`wait_cancelled` as a new task, this only registers a done callback.
+    """
+    task.cancel()
+    _cancelling_tasks.add(task)
+    task.add_done_callback(_cancelling_tasks.discard)
@@ -1,5 +1,7 @@
+import dataclasses
 import ipaddress
 import logging
+import pickle
 import unittest
 import socket
 from dataclasses import replace
@@ -88,6 +90,24 @@ class TestConfig(unittest.TestCase):
 
         self.assertEqual(evgr.create_subscribe_entry(), entry)
 
+    def test_eventgroup_subscribe_ipv6_scoped(self):
+        evgr = cfg.Eventgroup(
+            service_id=0xDEAD,
+            instance_id=0x42,
+            major_version=23,
+            eventgroup_id=0xF00BAA,
+            sockname=("fe80::1%lo", 4321, 0, 1),
+            protocol=hdr.L4Protocols.UDP,
+        )
+
+        ep = hdr.IPv6EndpointOption(
+            address=ipaddress.IPv6Address("fe80::1"),
+            l4proto=hdr.L4Protocols.UDP,
+            port=4321,
+        )
+
+        self.assertEqual(evgr.create_subscribe_entry().options_1, (ep,))
+
     def test_eventgroup_for_service_no_match(self):
         sockaddr = "203.0.113.78", 4321
 
@@ -153,6 +173,13 @@ class TestConfig(unittest.TestCase):
         )
 
         self.assertEqual(evgr.for_service(srv), replace(evgr, major_version=0xAA))
+        self.assertIs(evgr.for_service(srv), evgr.for_service(srv))
+
+        # caches are not part of the dataclass
+        self.assertEqual(len(dataclasses.astuple(evgr)), 6)
+        copied = pickle.loads(pickle.dumps(evgr))
+        self.assertEqual(copied, evgr)
+        self.assertEqual(copied.for_service(srv), evgr.for_service(srv))
 
     def test_service_convert_offer(self):
         host_1 = ipaddress.ip_address("2001:db8::1234:5678:dead:beef")
@@ -186,6 +213,8 @@ class TestConfig(unittest.TestCase):
         )
 
         self.assertEqual(srv.create_offer_entry(), offer)
+        self.assertIs(srv.create_offer_entry(), srv.create_offer_entry())
+        self.assertEqual(srv.create_offer_entry(ttl=0), replace(offer, ttl=0))
         self.assertEqual(cfg.Service.from_offer_entry(offer), srv)
 
         sd_hdr = hdr.SOMEIPSDHeader(entries=(offer,))
@@ -206,6 +235,28 @@ class TestConfig(unittest.TestCase):
                 )
             )
 
+    def test_service_fields(self):
+        srv = cfg.Service(service_id=0x1234, instance_id=0x5678)
+        srv.create_offer_entry()
+
+        # entry caches are not part of the dataclass
+        self.assertEqual(
+            [f.name for f in dataclasses.fields(srv)],
+            [
+                "service_id",
+                "instance_id",
+                "major_version",
+                "minor_version",
+                "options_1",
+                "options_2",
+                "eventgroups",
+            ],
+        )
+
+        copied = pickle.loads(pickle.dumps(srv))
+        self.assertEqual(copied, srv)
+        self.assertEqual(copied.create_offer_entry(), srv.create_offer_entry())
+
     def test_service_convert_find(self):
         srv = cfg.Service(
             service_id=0x0000,
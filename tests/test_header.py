@@ -1,6 +1,9 @@
 import asyncio
+import dataclasses
 import ipaddress
 import logging
+import pickle
+import struct
 import unittest
 from dataclasses import replace
 
@@ -47,6 +50,12 @@ class TestHeader(unittest.IsolatedAsyncioTestCase):
         self._check(payload, message, hdr.SOMEIPHeader.parse, extra=b"\1\2\3\4")
         self._check(payload, message, hdr.SOMEIPHeader.parse, extra=payload)
 
+        buf = b"\1\2" + payload + payload
+        self.assertEqual(hdr.SOMEIPHeader.parse_from(buf, 2), (message, 18))
+        self.assertEqual(hdr.SOMEIPHeader.parse_from(buf, 18), (message, 34))
+        with self.assertRaises(hdr.IncompleteReadError):
+            hdr.SOMEIPHeader.parse_from(buf, 34)
+
     def test_someip_with_payload(self):
         payload = (
             b"\xde\xad\xbe\xef\x00\x00\x00\x0a\xcc\xcc\xdd\xdd\x01\x02\x40\x04\xaa\x55"
@@ -81,6 +90,53 @@ class TestHeader(unittest.IsolatedAsyncioTestCase):
         )
         self._check(payload, message, hdr.SOMEIPHeader.parse, extra=b"\1\2\3\4")
 
+    def test_someip_build_into(self):
+        payload = (
+            b"\xde\xad\xbe\xef\x00\x00\x00\x0a\xcc\xcc\xdd\xdd\x01\x02\x40\x04\xaa\x55"
+        )
+        message = hdr.SOMEIPHeader(
+            service_id=0xDEAD,
+            method_id=0xBEEF,
+            client_id=0xCCCC,
+            session_id=0xDDDD,
+            protocol_version=1,
+            interface_version=2,
+            message_type=hdr.SOMEIPMessageType.REQUEST_ACK,
+            return_code=hdr.SOMEIPReturnCode.E_NOT_READY,
+            payload=b"\xaa\x55",
+        )
+        buf = bytearray(b"\xff" * 24)
+        self.assertEqual(message.build_into(buf, 2), 18)
+        self.assertEqual(buf, b"\xff\xff" + payload + b"\xff\xff\xff\xff")
+
+        # a buffer too small for the payload is left untouched
+        buf = bytearray(17)
+        with self.assertRaises(struct.error):
+            message.build_into(buf)
+        self.assertEqual(buf, bytearray(17))
+
+        self.assertIs(type(message.build()), bytes)
+
+    def test_someip_build_from_template(self):
+        message = hdr.SOMEIPHeader(
+            service_id=0xDEAD,
+            method_id=0xBEEF,
+            client_id=0xCCCC,
+            session_id=0xDDDD,
+            interface_version=2,
+            message_type=hdr.SOMEIPMessageType.NOTIFICATION,
+            payload=b"\xaa\x55",
+        )
+        template = message.build_template()
+        self.assertEqual(len(template), 16)
+
+        buf = hdr.SOMEIPHeader.build_from_template(template, 0xDDDD, b"\xaa\x55")
+        self.assertEqual(buf, message.build())
+
+        other = replace(message, session_id=0x1234, payload=b"\x01\x02\x03")
+        hdr.SOMEIPHeader.build_from_template(template, 0x1234, b"\x01\x02\x03", buf)
+        self.assertEqual(buf, message.build() + other.build())
+
     def test_someip_short(self):
         payload = b"\xde\xad\xbe\xef\x00\x00\x00\x08\xcc\xcc\xdd\xdd\x01\x02\x40"
         with self.assertRaises(hdr.ParseError):
@@ -327,6 +383,59 @@ class TestHeader(unittest.IsolatedAsyncioTestCase):
                 b"\x00\x0a\x04\x00\x01\x02\xfe\xff\x00\x06\x03\xff\xff"
             )
 
+    async def test_sdoption_ipv6_addrinfo(self):
+        option = hdr.IPv6EndpointOption(
+            address=ipaddress.IPv6Address("2001:db8::1"),
+            l4proto=hdr.L4Protocols.UDP,
+            port=30509,
+        )
+        self.assertEqual(await option.addrinfo(), ("2001:db8::1", 30509, 0, 0))
+
+    def test_sdoption_parsed_address(self):
+        for option in (
+            hdr.IPv4EndpointOption(
+                address=ipaddress.IPv4Address("192.168.0.1"),
+                l4proto=hdr.L4Protocols.UDP,
+                port=30509,
+            ),
+            hdr.IPv6EndpointOption(
+                address=ipaddress.IPv6Address("2001:db8::1"),
+                l4proto=hdr.L4Protocols.UDP,
+                port=30509,
+            ),
+        ):
+            parsed, _ = hdr.SOMEIPSDOption.parse(option.build())
+            self.assertIsInstance(parsed.address, type(option.address))
+            self.assertEqual(parsed.address, option.address)
+            self.assertEqual(hash(parsed.address), hash(option.address))
+            self.assertEqual(str(parsed.address), str(option.address))
+            self.assertEqual(parsed.address.packed, option.address.packed)
+
+    def test_sdoption_ip_fields(self):
+        option = hdr.IPv4EndpointOption(
+            address=ipaddress.IPv4Address("192.168.0.1"),
+            l4proto=hdr.L4Protocols.UDP,
+            port=30509,
+        )
+        # cached address representations are not part of the dataclass
+        self.assertEqual(
+            dataclasses.astuple(option),
+            (option.address, hdr.L4Protocols.UDP, 30509),
+        )
+
+        copied = pickle.loads(pickle.dumps(option))
+        self.assertEqual(copied, option)
+        self.assertEqual(copied.build(), option.build())
+
+    def test_sdoption_built(self):
+        option = hdr.SOMEIPSDLoadBalancingOption(priority=0x1234, weight=0x5678)
+        self.assertEqual(option.built, option.build())
+        self.assertIs(option.built, option.built)
+
+        other = replace(option, weight=0x0102)
+        self.assertEqual(other.built, other.build())
+        self.assertNotEqual(other.built, option.built)
+
     def test_sdoption_config(self):
         payload = b"\x00\x02\x01\x00\x00"
         option = hdr.SOMEIPSDConfigOption(configs=())
@@ -463,6 +572,13 @@ class TestHeader(unittest.IsolatedAsyncioTestCase):
                 b"\xa5\x00\x00\x00\x00\x00\x00\x00\xff\xff\xff\xff"
             )
 
+        # option runs past the options array into the rest of the buffer
+        with self.assertRaises(hdr.ParseError):
+            hdr.SOMEIPSDHeader.parse(
+                b"\xa5\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x04"
+                b"\x00\x02\x77\x00\x00"
+            )
+
     def test_sd_option_indexes(self):
         newopt = hdr.SOMEIPSDConfigOption(configs={"foo": "bar"}.items())
         entries = [
@@ -1,10 +1,13 @@
 # vim:foldmethod=marker:foldlevel=0
 import asyncio
+import copy
+import dataclasses
 import ipaddress
 import itertools
 import logging
 import math
 import os
+import pickle
 import socket
 import struct
 import sys
@@ -469,7 +472,7 @@ class TestSD(unittest.IsolatedAsyncioTestCase):
         self.assertEqual(subscribe().method_calls, [])
         self.assertEqual(
             discover().method_calls,
-            [unittest.mock.call.handle_offer(offer_entry, self.fake_addr)],
+            [unittest.mock.call.handle_offers([offer_entry], self.fake_addr)],
         )
         self.assertCountEqual(
             announce().method_calls,
@@ -493,7 +496,7 @@ class TestSD(unittest.IsolatedAsyncioTestCase):
         self.assertEqual(subscribe().method_calls, [])
         self.assertEqual(
             discover().method_calls,
-            [unittest.mock.call.handle_offer(offer_entry, self.fake_addr)],
+            [unittest.mock.call.handle_offers([offer_entry], self.fake_addr)],
         )
         self.assertEqual(
             announce().method_calls,
@@ -705,6 +708,39 @@ class TestSDDiscoveryTTLForever(_BaseSDDiscoveryTest):
 
         newmock.service_stopped.assert_not_called()
 
+    async def test_watch_listener_raises(self):
+        newmock = unittest.mock.Mock()
+        newmock.service_offered.side_effect = [RuntimeError, None]
+        with self.assertLogs(self.prot.log, "ERROR"):
+            self.prot.watch_all_services(newmock)
+        await settle()
+
+        # the exception neither reached the caller nor skipped the second service
+        self.assertEqual(
+            newmock.service_offered.call_args_list,
+            [
+                unittest.mock.call(self.cfg_offer_5566, self.fake_addr),
+                unittest.mock.call(self.cfg_offer_5567, self.fake_addr),
+            ],
+        )
+
+    async def test_handle_offers_listener_raises(self):
+        other_addr = ("2001:db8::3", 30490, 0, 0)
+        self.mock.service_offered.side_effect = [RuntimeError, None]
+
+        with self.assertLogs(self.prot.log, "ERROR"):
+            self.prot.handle_offers([self.offer_5566, self.offer_5567], other_addr)
+
+        # the exception did not keep the second offer from being handled
+        self.assertEqual(
+            self.mock.service_offered.call_args_list,
+            [
+                unittest.mock.call(self.cfg_offer_5566, other_addr),
+                unittest.mock.call(self.cfg_offer_5567, other_addr),
+            ],
+        )
+        self.assertIn(self.cfg_offer_5567, self.prot.found_services.store[other_addr])
+
     async def test_stop_watch_all(self):
         self.prot.stop_watch_all_services(self.mock)
         await settle()
@@ -1021,6 +1057,112 @@ class TestSDDiscoveryTTL1(_BaseSDDiscoveryTest):
 # }}}
 
 
+class TestTimedStore(unittest.IsolatedAsyncioTestCase):
+    fake_addr = ("2001:db8::2", 30490, 0, 0)
+
+    async def test_refresh_extends_expiry(self):
+        store: sd.TimedStore[str] = sd.TimedStore(logging.getLogger("someip.sd"))
+        callback_new = unittest.mock.Mock()
+        callback_expired = unittest.mock.Mock()
+
+        store.refresh(ticks(1), self.fake_addr, "a", callback_new, callback_expired)
+        _, handle, _ = store.store[self.fake_addr]["a"]
+
+        await asyncio.sleep(ticks(0.6))
+        store.refresh(ticks(1), self.fake_addr, "a", callback_new, callback_expired)
+        # the pending timeout is kept and re-armed when it fires
+        self.assertIs(store.store[self.fake_addr]["a"][1], handle)
+        callback_new.assert_called_once_with("a", self.fake_addr)
+
+        await asyncio.sleep(ticks(0.6))
+        callback_expired.assert_not_called()
+        self.assertEqual(list(store.entries()), ["a"])
+
+        await asyncio.sleep(ticks(0.6))
+        callback_expired.assert_called_once_with("a", self.fake_addr)
+        self.assertEqual(list(store.entries()), [])
+
+    async def test_refresh_forever(self):
+        store: sd.TimedStore[str] = sd.TimedStore(logging.getLogger("someip.sd"))
+        callback_expired = unittest.mock.Mock()
+
+        store.refresh(
+            ticks(1), self.fake_addr, "a", unittest.mock.Mock(), callback_expired
+        )
+        store.refresh(
+            sd.TTL_FOREVER, self.fake_addr, "a", unittest.mock.Mock(), callback_expired
+        )
+
+        await asyncio.sleep(ticks(1.2))
+        callback_expired.assert_not_called()
+        self.assertEqual(list(store.entries()), ["a"])
+
+    async def test_stop_all_callback_raises(self):
+        log = logging.getLogger("someip.sd")
+        store: sd.TimedStore[str] = sd.TimedStore(log)
+        callback_expired = unittest.mock.Mock(side_effect=[RuntimeError, None])
+
+        for entry in ("a", "b"):
+            store.refresh(
+                ticks(1), self.fake_addr, entry, unittest.mock.Mock(), callback_expired
+            )
+
+        with self.assertLogs(log, "ERROR"):
+            store.stop_all_for_address(self.fake_addr)
+
+        # the failing callback did not keep the second entry from being notified
+        self.assertEqual(
+            callback_expired.call_args_list,
+            [
+                unittest.mock.call("a", self.fake_addr),
+                unittest.mock.call("b", self.fake_addr),
+            ],
+        )
+        self.assertEqual(list(store.entries()), [])
+
+    async def test_stop_all_callback_modifies_store(self):
+        log = logging.getLogger("someip.sd")
+        store: sd.TimedStore[str] = sd.TimedStore(log)
+        other_addr = ("2001:db8::ff", 30332, 0, 0)
+        callback_expired = unittest.mock.Mock()
+        # looking up another address from a callback must not break iteration
+        callback_expired.side_effect = lambda *_: store.stop_all_for_address(other_addr)
+
+        store.refresh(
+            ticks(1), self.fake_addr, "a", unittest.mock.Mock(), callback_expired
+        )
+
+        store.stop_all()
+
+        callback_expired.assert_called_once_with("a", self.fake_addr)
+        self.assertEqual(list(store.entries()), [])
+
+
+class TestEventgroupSubscription(unittest.TestCase):
+    def test_copy(self):
+        sub = sd.EventgroupSubscription(
+            service_id=0x5566,
+            instance_id=0x7788,
+            major_version=1,
+            id=0x3333,
+            counter=0,
+            ttl=3,
+        )
+        self.assertEqual(
+            dataclasses.astuple(sub),
+            (0x5566, 0x7788, 1, 0x3333, 0, 3, frozenset(), ()),
+        )
+        self.assertEqual(hash(sub), hash(replace(sub, ttl=0)))
+
+        for copied in (
+            copy.copy(sub),
+            copy.deepcopy(sub),
+            pickle.loads(pickle.dumps(sub)),
+        ):
+            self.assertEqual(copied, sub)
+            self.assertEqual(hash(copied), hash(sub))
+
+
 # {{{ ServiceDiscover FindService
 class TestSDFind(unittest.IsolatedAsyncioTestCase, _SendTiming):
     multi_addr = ("2001:db8::1", 30490, 0, 0)
@@ -1426,6 +1568,30 @@ class TestSubscribeEventgroupTTL3(TestSubscribeEventgroup):
         )
         self._mock_send_sd.reset_mock()
 
+    async def test_subscribe_batched(self):
+        self.prot.start()
+        await settle()
+        self._mock_send_sd.assert_not_called()
+
+        self.prot.subscribe_eventgroup(self.evgrp_1, self.remote1_addr)
+        self.prot.subscribe_eventgroup(self.evgrp_2, self.remote2_addr)
+        self.prot.subscribe_eventgroup(self.evgrp_3, self.remote1_addr)
+        self.prot.stop_subscribe_eventgroup(self.evgrp_1, self.remote1_addr)
+
+        await settle()
+
+        self.assertCountEqual(
+            self._mock_send_sd.call_args_list,
+            (
+                unittest.mock.call(
+                    [self.sub_evgrp_1, self.sub_evgrp_3, self.stop_sub_evgrp_1],
+                    remote=self.remote1_addr,
+                ),
+                unittest.mock.call([self.sub_evgrp_2], remote=self.remote2_addr),
+            ),
+        )
+        self.prot.stop(send_stop_subscribe=False)
+
 
 class TestSubscribeEventgroupTTLForever(TestSubscribeEventgroup):
     TTL = sd.TTL_FOREVER
@@ -1566,6 +1732,31 @@ class TestSDAnnounce(unittest.IsolatedAsyncioTestCase, _SendTiming):
         self.prot.announce_service(self.inst_5566)
         self.prot.announce_service(self.inst_2233)
 
+    async def test_deprecated_send_queues(self):
+        entry = self.cfg_service_5566.create_offer_entry()
+        self.prot.queue_send(entry, remote=self.fake_addr)
+
+        with self.assertWarns(DeprecationWarning):
+            queues = self.prot.send_queues
+        self.assertEqual(dict(queues), {self.fake_addr: [entry]})
+
+        with self.assertWarns(DeprecationWarning):
+            collector = sd.SendCollector(ticks(0.1), self._mock_send_sd, remote=None)
+        collector.append(entry)
+        await asyncio.sleep(ticks(0.5))
+        self._mock_send_sd.assert_any_call([entry], remote=None)
+
+    async def test_announcing_services_read_only(self):
+        services = self.prot.announcing_services
+        self.assertEqual(services, (self.inst_5566, self.inst_2233))
+        with self.assertRaises(AttributeError):
+            services.append(self.inst_5566)
+
+        self.prot.stop_announce_service(self.inst_5566, send_stop=False)
+        self.assertEqual(self.prot.announcing_services, (self.inst_2233,))
+        with self.assertRaises(ValueError):
+            self.prot.stop_announce_service(self.inst_5566, send_stop=False)
+
     async def test_announce_non_cyclic(self):
         self.prot.timings.REPETITIONS_MAX = 2
         self.prot.timings.CYCLIC_OFFER_DELAY = 0
@@ -1675,6 +1866,32 @@ class TestSDAnnounce(unittest.IsolatedAsyncioTestCase, _SendTiming):
 
         self.assertTiming()
 
+    async def test_find_service_candidates(self):
+        cfg_service_5566_any = cfg.Service(service_id=0x5566, instance_id=0xFFFF)
+        cfg_service_5566_other = cfg.Service(service_id=0x5566, instance_id=0x0001)
+        inst_any = sd.ServiceInstance(
+            cfg_service_5566_any, unittest.mock.Mock(), self.prot, self.prot.timings
+        )
+        inst_other = sd.ServiceInstance(
+            cfg_service_5566_other, unittest.mock.Mock(), self.prot, self.prot.timings
+        )
+        self.prot.announce_service(inst_any)
+        self.prot.announce_service(inst_other)
+
+        def candidates(service):
+            return list(self.prot._candidates(service.create_find_entry()))
+
+        self.assertEqual(candidates(self.cfg_service_5566), [self.inst_5566, inst_any])
+        self.assertEqual(candidates(cfg_service_5566_other), [inst_other, inst_any])
+        self.assertCountEqual(
+            candidates(cfg_service_5566_any), [self.inst_5566, inst_any, inst_other]
+        )
+        self.assertEqual(candidates(self.cfg_service_9999), [])
+
+        self.prot.stop_announce_service(inst_any, send_stop=False)
+        self.prot.stop_announce_service(inst_other, send_stop=False)
+        self.assertEqual(candidates(cfg_service_5566_any), [self.inst_5566])
+
     async def test_find_service_unknown(self):
 
         self.prot.start()
@@ -2226,6 +2443,30 @@ class _MulticastEndpointsTest:
         self.trsp_u.close()
         self.trsp_m.close()
 
+    async def test_endpoint_socket_buffers(self):
+        trsp_u, trsp_m, _ = await sd.ServiceDiscoveryProtocol.create_endpoints(
+            family=self.AF,
+            local_addr=self.bind_lo_addr,
+            multicast_addr=self.bind_mc_addr,
+            port=30490,
+            multicast_interface=self.bind_interface,
+            rcvbuf=65536,
+            sndbuf=32768,
+        )
+        try:
+            for trsp in (trsp_u, trsp_m):
+                sock = trsp.get_extra_info("socket")
+                # Linux doubles the requested value for bookkeeping overhead
+                self.assertGreaterEqual(
+                    sock.getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF), 65536
+                )
+                self.assertGreaterEqual(
+                    sock.getsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF), 32768
+                )
+        finally:
+            trsp_u.close()
+            trsp_m.close()
+
     async def test_endpoint_recv_unicast(self):
         payload = (
             b"\x40\x00\x00\x00"
@@ -258,6 +258,21 @@ class TestService(unittest.IsolatedAsyncioTestCase):
         )
         self.mock.reset_mock()
 
+        # cached error header, only client and session id change
+        get = replace(get, client_id=0x1234, session_id=0x5678)
+        with self.assertLogs(self.prot.log, "WARNING"):
+            self.prot.message_received(get, self.fake_addr, False)
+
+        self.mock.sendto.assert_called_once_with(
+            replace(
+                get,
+                message_type=hdr.SOMEIPMessageType.ERROR,
+                return_code=hdr.SOMEIPReturnCode.E_UNKNOWN_SERVICE,
+            ).build(),
+            self.fake_addr,
+        )
+        self.mock.reset_mock()
+
     def test_call_bad_version(self):
         get = hdr.SOMEIPHeader(
             service_id=self.prot.service_id,
@@ -369,8 +384,17 @@ class TestService(unittest.IsolatedAsyncioTestCase):
             message_type=hdr.SOMEIPMessageType.REQUEST,
             return_code=hdr.SOMEIPReturnCode.E_OK,
         )
-        with self.assertWarnsRegex(UserWarning, r"(?i)multicast"):
+        with self.assertLogs(self.prot.log, "WARNING") as cm:
+            self.prot.message_received(get, self.fake_addr, True)
+        self.assertRegex(cm.output[0], r"(?i)multicast")
+
+        # further packets are only counted
+        with unittest.mock.patch.object(self.prot.log, "warning") as warning:
             self.prot.message_received(get, self.fake_addr, True)
+        warning.assert_not_called()
+
+        self.assertEqual(self.prot.multicast_dropped, 2)
+        self.mock.sendto.assert_not_called()
 
     def test_call_malformed(self):
         get = hdr.SOMEIPHeader(
@@ -398,6 +422,32 @@ class TestService(unittest.IsolatedAsyncioTestCase):
         )
         self.mock.reset_mock()
 
+    def test_call_removed_method(self):
+        get = hdr.SOMEIPHeader(
+            service_id=self.prot.service_id,
+            method_id=1,
+            client_id=0xCCCC,
+            session_id=0xDDDD,
+            protocol_version=1,
+            interface_version=self.prot.version_major,
+            message_type=hdr.SOMEIPMessageType.REQUEST,
+            return_code=hdr.SOMEIPReturnCode.E_OK,
+        )
+        # methods is a plain dict, changes apply to the next request
+        del self.prot.methods[1]
+
+        with self.assertLogs(self.prot.log, "WARNING"):
+            self.prot.message_received(get, self.fake_addr, False)
+
+        self.mock.sendto.assert_called_once_with(
+            replace(
+                get,
+                message_type=hdr.SOMEIPMessageType.ERROR,
+                return_code=hdr.SOMEIPReturnCode.E_UNKNOWN_METHOD,
+            ).build(),
+            self.fake_addr,
+        )
+
     def test_register_duplicate(self):
         with self.assertRaises(KeyError):
             self.prot.register_method(1, self.prot.method_reset_counter)
@@ -64,6 +64,21 @@ class TestWait(unittest.IsolatedAsyncioTestCase):
         with self.assertRaises(Sentinel):
             await utils.wait_cancelled(task)
 
+    async def test_cancel_task(self):
+        event = asyncio.Event()
+
+        async def f():
+            await event.wait()
+
+        task = asyncio.create_task(f())
+        await asyncio.sleep(0.001)
+        utils.cancel_task(task)
+        self.assertIn(task, utils._cancelling_tasks)
+
+        await asyncio.sleep(0.001)
+        self.assertTrue(task.cancelled())
+        self.assertNotIn(task, utils._cancelling_tasks)
+
 
 class TestGAI(unittest.IsolatedAsyncioTestCase):
     async def test_lo4(self):